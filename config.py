@@ -0,0 +1,18 @@
+"""
+Shared configuration lookups.
+load_dotenv walks the filesystem for a .env file; caching the resolved
+values means that cost is paid once per process no matter how many
+modules ask for the same key.
+"""
+
+import os
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+
+@lru_cache(maxsize=None)
+def nvidia_key():
+    """Return NVIDIA_API_KEY, loading .env exactly once per process."""
+    load_dotenv()
+    return os.getenv("NVIDIA_API_KEY")
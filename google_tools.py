@@ -12,15 +12,17 @@ from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
 import pickle
 import os
 import logging
+import threading
 from typing import Dict, Any, List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import io
 
 logger = logging.getLogger(__name__)
 
 # Google API Scopes - Complete list for all services
-SCOPES = [
+# A tuple keeps the scope set immutable and hashable for credential checks
+SCOPES = (
     # Gmail (already authorized)
     'https://www.googleapis.com/auth/gmail.send',
     'https://www.googleapis.com/auth/gmail.readonly',
@@ -43,27 +45,75 @@ SCOPES = [
     'https://www.googleapis.com/auth/drive.readonly',
     # YouTube Data API
     'https://www.googleapis.com/auth/youtube.readonly',
-]
+)
 
 GOOGLE_CREDENTIALS_PATH = os.getenv("GOOGLE_CREDENTIALS_PATH", "credentials.json")
 # Use a new token file to avoid scope conflicts
 GOOGLE_TOKEN_PATH = os.getenv("GOOGLE_TOKEN_PATH", "token_full_access.pickle")
 
 
+# In-process credential cache: every tool call was re-reading and
+# unpickling the token file and potentially blocking on a synchronous
+# refresh. Credentials are cached here and refreshed proactively when
+# they get within the margin of expiry.
+_cached_creds = None
+_creds_lock = threading.Lock()
+_CREDS_REFRESH_MARGIN = timedelta(minutes=5)
+
+
+def _creds_fresh(creds) -> bool:
+    """True if credentials are valid and not about to expire."""
+    if not creds or not creds.valid:
+        return False
+    expiry = getattr(creds, 'expiry', None)
+    if expiry is not None and expiry - datetime.utcnow() < _CREDS_REFRESH_MARGIN:
+        return False
+    return True
+
+
 def get_google_credentials():
     """Get or refresh Google API credentials with all required scopes."""
-    creds = None
+    global _cached_creds
+
+    with _creds_lock:
+        if _creds_fresh(_cached_creds):
+            return _cached_creds
+        creds = _load_or_refresh_credentials()
+        _cached_creds = creds
+        return creds
+
+
+# Prebuilt for the scope-coverage check - no per-call set() rebuild
+_REQUIRED_SCOPES = frozenset(SCOPES)
+
+
+def _load_token_file():
+    """Load the saved OAuth token, migrating legacy pickle files to JSON."""
+    try:
+        return Credentials.from_authorized_user_file(GOOGLE_TOKEN_PATH, SCOPES)
+    except FileNotFoundError:
+        return None
+    except (ValueError, UnicodeDecodeError):
+        try:
+            with open(GOOGLE_TOKEN_PATH, 'rb') as token:
+                creds = pickle.load(token)
+            with open(GOOGLE_TOKEN_PATH, 'w') as token:
+                token.write(creds.to_json())
+            logger.info("Migrated legacy pickle token to JSON")
+            return creds
+        except Exception as e:
+            logger.warning(f"Could not read legacy token file: {e}")
+            return None
+
+
+def _load_or_refresh_credentials():
+    """Load credentials from disk, refreshing or re-authenticating as needed."""
+    creds = _load_token_file()
     
-    # Load existing credentials
-    if os.path.exists(GOOGLE_TOKEN_PATH):
-        with open(GOOGLE_TOKEN_PATH, 'rb') as token:
-            creds = pickle.load(token)
-        
+    if creds is not None:
         # Check if existing credentials have all required scopes
         if creds and hasattr(creds, 'scopes'):
-            existing_scopes = set(creds.scopes)
-            required_scopes = set(SCOPES)
-            missing_scopes = required_scopes - existing_scopes
+            missing_scopes = _REQUIRED_SCOPES - frozenset(creds.scopes)
             
             if missing_scopes:
                 logger.warning(f"Token has missing scopes: {missing_scopes}")
@@ -88,9 +138,9 @@ def get_google_credentials():
                 GOOGLE_CREDENTIALS_PATH, SCOPES)
             creds = flow.run_local_server(port=0)
         
-        # Save credentials
-        with open(GOOGLE_TOKEN_PATH, 'wb') as token:
-            pickle.dump(creds, token)
+        # Save credentials as JSON (small, fast and safe to load)
+        with open(GOOGLE_TOKEN_PATH, 'w') as token:
+            token.write(creds.to_json())
         logger.info(f"Credentials saved to {GOOGLE_TOKEN_PATH}")
     
     return creds
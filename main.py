@@ -12,11 +12,20 @@ from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage
 import httpx
+import orjson
 import os
+from collections import OrderedDict, defaultdict, deque
+from functools import lru_cache
 from typing import Dict, List, Optional
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv
+import io
 import json
+import re
+import shutil
+import time
 from pydub import AudioSegment
 from contextlib import asynccontextmanager
 import aiofiles
@@ -29,6 +38,7 @@ from tools import (
     transcribe_audio,
     convert_text_to_speech,
     web_search,
+    browser_automation,
     send_email,
     search_emails,
     create_calendar_event,
@@ -49,6 +59,13 @@ from google_tools import google_tools_list
 # Import Vision tools
 from vision_tools import vision_tools_list
 
+# Speculative tool prefetch (history-driven)
+import tool_prefetch
+
+# Redis-backed conversation state (pipelined); in-memory dicts remain the
+# fallback when REDIS_URL is not configured
+import redis_store
+
 # Combine all tools
 all_tools = tools_list + google_tools_list + vision_tools_list
 
@@ -68,16 +85,64 @@ if not TELEGRAM_BOT_TOKEN:
     logger.error("TELEGRAM_BOT_TOKEN not set!")
 
 # In-memory conversation history (consider moving to Redis for production)
-conversation_history: Dict[str, List] = {}
-# Track processed messages to avoid re-processing
-processed_messages: Dict[str, set] = {}
+# deque(maxlen=20) keeps the last 10 exchanges with O(1) append/evict
+conversation_history: Dict[str, deque] = defaultdict(lambda: deque(maxlen=20))
+# Track processed messages to avoid re-processing; OrderedDict gives O(1)
+# membership plus FIFO eviction of the oldest IDs once the cap is hit
+processed_messages: Dict[str, OrderedDict] = defaultdict(OrderedDict)
+# How many processed message IDs to remember per user
+PROCESSED_MESSAGES_MAX = 100
+
+# Cap on concurrent in-flight webhook updates; beyond this we shed load
+MAX_BACKGROUND_TASKS = 100
+
+# orjson serializes/parses at C speed; reused for every Telegram API call
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Shared pooled HTTP client - keepalive (and HTTP/2) connections to
+# api.telegram.org skip the TCP+TLS handshake on every call. Closed in
+# the lifespan shutdown hook.
+http_client = httpx.AsyncClient(
+    http2=True,
+    timeout=120.0,
+    limits=httpx.Limits(max_keepalive_connections=32, keepalive_expiry=60),
+)
+
+# Transcriptions keyed by Telegram file_unique_id: webhook retries and
+# forwarded voice notes reuse the cached text instead of re-running Whisper
+_transcription_cache: "OrderedDict[str, str]" = OrderedDict()
+TRANSCRIPTION_CACHE_MAX = 256
+TRANSCRIPTION_TTL_SECONDS = 7 * 24 * 3600
+
+# Clear-conversation commands, matched as one precompiled pattern instead of
+# lowercasing every incoming message against a freshly-built list
+_CLEAR_COMMAND_RE = re.compile(
+    r"^\s*(/clear(_cache)?|clear (cache|memory)|forget everything|reset memory)\s*$",
+    re.IGNORECASE,
+)
+
+# Characters Telegram's Markdown parser cares about; replies without any of
+# them can skip the parse-and-retry dance entirely
+_MARKDOWN_CHARS_RE = re.compile(r"[_*`\[\]]")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan event handler for startup and shutdown."""
     # Startup
+    # Move log I/O off the event loop: the async code only enqueues records,
+    # a dedicated thread does the actual (blocking) stream writes
+    root_logger = logging.getLogger()
+    log_queue = queue.Queue(-1)
+    log_listener = QueueListener(
+        log_queue, *root_logger.handlers, respect_handler_level=True
+    )
+    root_logger.handlers = [QueueHandler(log_queue)]
+    log_listener.start()
+
     logger.info("AI Agent Backend starting up...")
+    # Track in-flight webhook tasks so they aren't garbage collected
+    app.state.background_tasks = set()
     logger.info(f"NVIDIA API Key configured: {bool(NVIDIA_API_KEY)}")
     logger.info(f"Telegram Bot Token configured: {bool(TELEGRAM_BOT_TOKEN)}")
     logger.info(f"Main Brain: qwen/qwen3-next-80b-a3b-instruct")
@@ -93,6 +158,12 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Browser cleanup on shutdown: {e}")
 
+    # Drain the connection pools, then flush queued log records
+    from tools import aclose_http_client
+    await aclose_http_client()
+    await http_client.aclose()
+    log_listener.stop()
+
 
 # Initialize FastAPI with lifespan
 app = FastAPI(
@@ -111,7 +182,10 @@ llm = ChatNVIDIA(
     streaming=False  # Disable streaming to prevent token-by-token output breaking tool calls
 )
 
-# Create agent prompt with streamlined instructions
+# Create agent prompt with streamlined instructions.
+# Keep the system block fully static (no per-turn dates/state) so providers
+# that do implicit prefix caching can reuse it across turns; only the user
+# message and chat_history vary.
 agent_prompt = ChatPromptTemplate.from_messages([
     ("system", """You are a helpful, obedient, and highly intelligent AI assistant. Your name is A-MAC.
 
@@ -803,144 +877,301 @@ User ID: {user_id}
     MessagesPlaceholder(variable_name="agent_scratchpad"),
 ])
 
-# Create agent using tool calling
-agent = create_tool_calling_agent(llm, all_tools, agent_prompt)
-
-# Create agent executor with stricter settings
-agent_executor = AgentExecutor(
-    agent=agent,
-    tools=all_tools,
-    verbose=True,
-    handle_parsing_errors=True,
-    max_iterations=15,  # Reduced from 30
-    early_stopping_method="force",
-    return_intermediate_steps=False
-)
+def build_agent_executor(tools: List) -> AgentExecutor:
+    """Build a tool-calling agent executor over the given toolset."""
+    agent = create_tool_calling_agent(llm, tools, agent_prompt)
+    return AgentExecutor(
+        agent=agent,
+        tools=tools,
+        verbose=True,
+        handle_parsing_errors=True,
+        max_iterations=15,  # Reduced from 30
+        early_stopping_method="force",
+        return_intermediate_steps=True  # Needed for tool-sequence tracking and audio-path recovery
+    )
+
+
+# Full-toolset executor (fallback when no group matches)
+agent_executor = build_agent_executor(all_tools)
+
+# Tool groups for per-turn subset selection - sending every tool schema on
+# every call balloons input tokens and gives the LLM more ways to pick the
+# wrong tool
+TOOL_GROUPS: Dict[str, List] = {
+    "search": [web_search, browser_automation],
+    "media": [read_document, transcribe_audio] + vision_tools_list,
+    "tts": [convert_text_to_speech],
+    "google_workspace": [
+        send_email, search_emails, create_calendar_event, list_calendar_events
+    ] + google_tools_list,
+    "memory": [
+        save_user_preference, get_user_preferences,
+        save_agent_state, get_agent_state, store_note, get_notes
+    ],
+}
+
+# Cheap always-available groups; the big prompt cost is in workspace/media
+ALWAYS_ON_GROUPS = frozenset({"search", "memory"})
+
+GROUP_KEYWORDS = {
+    "google_workspace": re.compile(
+        r"email|e-mail|mail|inbox|gmail|calendar|event|meeting|schedule|remind"
+        r"|contact|docs?|sheet|spreadsheet|drive|upload|youtube",
+        re.IGNORECASE,
+    ),
+    "media": re.compile(
+        r"image|photo|picture|screenshot|video|audio|voice|pdf|docx|pptx"
+        r"|transcri|analyz|\[Image path:|\[Video path:|Document content:",
+        re.IGNORECASE,
+    ),
+    "tts": re.compile(
+        r"say|speak|text[- ]to[- ]speech|tts|read (it |this )?aloud"
+        r"|your voice",
+        re.IGNORECASE,
+    ),
+}
+
+
+def select_tool_groups(user_prompt: str) -> frozenset:
+    """
+    Pick the tool groups relevant to this turn from cheap keyword matches.
+    Returns an empty frozenset to mean "use the full toolset" when nothing
+    matches (better to over-provision than to hide the right tool).
+    """
+    matched = {
+        group for group, pattern in GROUP_KEYWORDS.items()
+        if pattern.search(user_prompt)
+    }
+    if not matched:
+        return frozenset()
+    matched |= ALWAYS_ON_GROUPS
+    if len(matched) == len(TOOL_GROUPS):
+        return frozenset()
+    return frozenset(matched)
+
+
+@lru_cache(maxsize=32)
+def get_agent_executor(group_key: frozenset) -> AgentExecutor:
+    """Return a cached executor for a group subset (built once per subset)."""
+    if not group_key:
+        return agent_executor
+    tools = [
+        tool for group, group_tools in TOOL_GROUPS.items()
+        if group in group_key
+        for tool in group_tools
+    ]
+    logger.info(f"Building agent executor for tool groups: {sorted(group_key)}")
+    return build_agent_executor(tools)
+
+
+# Telegram file paths are stable for the life of a message, so cache
+# getFile lookups and save a round-trip when the same file_id recurs
+_file_url_cache: Dict[str, tuple] = {}
+_file_url_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+FILE_URL_CACHE_TTL = 3600.0
+FILE_URL_CACHE_MAX = 256
 
 
 async def get_telegram_file_url(file_id: str) -> str:
-    """Get download URL for a Telegram file."""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{TELEGRAM_API_URL}/getFile", params={"file_id": file_id})
+    """Get download URL for a Telegram file (cached by file_id)."""
+    cached = _file_url_cache.get(file_id)
+    if cached and time.monotonic() - cached[1] < FILE_URL_CACHE_TTL:
+        return cached[0]
+
+    # Per-file_id lock so concurrent cold lookups collapse into one fetch
+    async with _file_url_locks[file_id]:
+        cached = _file_url_cache.get(file_id)
+        if cached and time.monotonic() - cached[1] < FILE_URL_CACHE_TTL:
+            return cached[0]
+
+        response = await http_client.get(
+            f"{TELEGRAM_API_URL}/getFile", params={"file_id": file_id}, timeout=30.0
+        )
         response.raise_for_status()
-        file_path = response.json()["result"]["file_path"]
-        return f"https://api.telegram.org/file/bot{TELEGRAM_BOT_TOKEN}/{file_path}"
+        file_path = orjson.loads(response.content)["result"]["file_path"]
+
+        url = f"https://api.telegram.org/file/bot{TELEGRAM_BOT_TOKEN}/{file_path}"
+        _file_url_cache[file_id] = (url, time.monotonic())
+
+        # Keep the cache bounded by dropping the stalest entry
+        if len(_file_url_cache) > FILE_URL_CACHE_MAX:
+            oldest = min(_file_url_cache, key=lambda k: _file_url_cache[k][1])
+            del _file_url_cache[oldest]
+            _file_url_locks.pop(oldest, None)
+
+        return url
+
+
+async def download_telegram_file(file_id: str, suffix: str, timeout: float = 30.0) -> str:
+    """Resolve a Telegram file_id and download it to a temp path."""
+    file_url = await get_telegram_file_url(file_id)
+
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    temp_file_path = temp_file.name
+    temp_file.close()
+
+    # Stream straight to disk in 64KB chunks - a 20MB upload should not
+    # sit in Python buffers (response.content + write buffer) in full
+    async with http_client.stream("GET", file_url, timeout=timeout) as response:
+        response.raise_for_status()
+
+        async with aiofiles.open(temp_file_path, 'wb') as f:
+            async for chunk in response.aiter_bytes(1 << 16):
+                await f.write(chunk)
+
+    logger.info(f"Downloaded file to: {temp_file_path}")
+    return temp_file_path
+
+
+async def download_telegram_files(file_ids: List[str], suffix: str) -> List[str]:
+    """Download several Telegram files concurrently instead of one by one."""
+    return await asyncio.gather(
+        *[download_telegram_file(file_id, suffix) for file_id in file_ids]
+    )
+
+
+def _convert_wav_to_mp3_blocking(audio_path: str) -> bytes:
+    """Encode a WAV file to in-memory MP3 with pydub (blocking; run in executor)."""
+    buf = io.BytesIO()
+    AudioSegment.from_wav(audio_path).export(buf, format='mp3', parameters=['-q:a', '4'])
+    return buf.getvalue()
 
 
 async def send_telegram_message(chat_id: int, text: str = None, audio_path: str = None):
     """Send a text message or audio file back to Telegram."""
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        if audio_path:
-            # Convert WAV to MP3 for better Telegram compatibility
-            logger.info(f"Converting audio file to MP3: {audio_path}")
+    if audio_path:
+        # Convert WAV to MP3 for better Telegram compatibility
+        logger.info(f"Converting audio file to MP3: {audio_path}")
+        
+        try:
+            async with aiofiles.open(audio_path, 'rb') as f:
+                wav_bytes = await f.read()
+
+            if shutil.which('ffmpeg'):
+                # Pipe WAV bytes through ffmpeg straight into an in-memory
+                # MP3 buffer - no .mp3 temp file, no extra disk round-trip
+                proc = await asyncio.create_subprocess_exec(
+                    'ffmpeg', '-i', 'pipe:0',
+                    '-f', 'mp3', '-codec:a', 'libmp3lame', '-q:a', '4',
+                    'pipe:1',
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL,
+                )
+                mp3_bytes, _ = await proc.communicate(input=wav_bytes)
+                if proc.returncode != 0 or not mp3_bytes:
+                    raise RuntimeError(f"ffmpeg exited with code {proc.returncode}")
+            else:
+                # Fallback when no ffmpeg binary is on PATH; pydub's encode is
+                # blocking CPU work, so push it off the event loop
+                mp3_bytes = await asyncio.get_running_loop().run_in_executor(
+                    None, _convert_wav_to_mp3_blocking, audio_path
+                )
+            logger.info(f"Audio converted to MP3 in memory ({len(mp3_bytes)} bytes)")
+
+            # Send the in-memory MP3 as a voice message
+            files = {'voice': ('reply.mp3', mp3_bytes, 'audio/mpeg')}
+            data = {'chat_id': chat_id}
+
+            response = await http_client.post(
+                f"{TELEGRAM_API_URL}/sendVoice",
+                files=files,
+                data=data
+            )
+            
+            response.raise_for_status()
+            logger.info(f"Voice message sent successfully to chat {chat_id}")
             
+            # Clean up the WAV file (the only temp file left)
             try:
-                # Load the WAV file
-                audio = AudioSegment.from_wav(audio_path)
-                
-                # Generate MP3 filename
-                mp3_path = audio_path.replace('.wav', '.mp3')
-                
-                # Export as MP3
-                audio.export(mp3_path, format='mp3', bitrate='128k')
-                logger.info(f"Audio converted to MP3: {mp3_path}")
-                
-                # Send the MP3 file as voice message
-                with open(mp3_path, 'rb') as audio_file:
-                    files = {'voice': (os.path.basename(mp3_path), audio_file, 'audio/mpeg')}
+                os.remove(audio_path)
+                logger.info(f"Cleaned up WAV file: {audio_path}")
+            except Exception as e:
+                logger.warning(f"Could not delete WAV file: {e}")
+            
+            return orjson.loads(response.content)
+        
+        except Exception as e:
+            logger.error(f"Failed to convert or send audio: {e}")
+            # If conversion fails, try sending as regular audio (not voice)
+            try:
+                with open(audio_path, 'rb') as audio_file:
+                    files = {'audio': (os.path.basename(audio_path), audio_file, 'audio/wav')}
                     data = {'chat_id': chat_id}
                     
-                    response = await client.post(
-                        f"{TELEGRAM_API_URL}/sendVoice",
+                    response = await http_client.post(
+                        f"{TELEGRAM_API_URL}/sendAudio",
                         files=files,
                         data=data
                     )
                 
                 response.raise_for_status()
-                logger.info(f"Voice message sent successfully to chat {chat_id}")
                 
-                # Clean up both WAV and MP3 files
+                # Clean up WAV file
                 try:
                     os.remove(audio_path)
-                    logger.info(f"Cleaned up WAV file: {audio_path}")
-                except Exception as e:
-                    logger.warning(f"Could not delete WAV file: {e}")
+                except Exception as cleanup_error:
+                    logger.warning(f"Could not delete file: {cleanup_error}")
                 
-                try:
-                    os.remove(mp3_path)
-                    logger.info(f"Cleaned up MP3 file: {mp3_path}")
-                except Exception as e:
-                    logger.warning(f"Could not delete MP3 file: {e}")
-                
-                return response.json()
-            
-            except Exception as e:
-                logger.error(f"Failed to convert or send audio: {e}")
-                # If conversion fails, try sending as regular audio (not voice)
-                try:
-                    with open(audio_path, 'rb') as audio_file:
-                        files = {'audio': (os.path.basename(audio_path), audio_file, 'audio/wav')}
-                        data = {'chat_id': chat_id}
-                        
-                        response = await client.post(
-                            f"{TELEGRAM_API_URL}/sendAudio",
-                            files=files,
-                            data=data
-                        )
-                    
-                    response.raise_for_status()
-                    
-                    # Clean up WAV file
-                    try:
-                        os.remove(audio_path)
-                    except Exception as cleanup_error:
-                        logger.warning(f"Could not delete file: {cleanup_error}")
-                    
-                    return response.json()
-                except Exception as fallback_error:
-                    logger.error(f"Fallback audio send also failed: {fallback_error}")
-                    raise
-        else:
-            # Send text message with Markdown formatting
-            # Escape special characters that might cause issues
-            try:
-                response = await client.post(
-                    f"{TELEGRAM_API_URL}/sendMessage",
-                    json={
-                        "chat_id": chat_id, 
-                        "text": text,
-                        "parse_mode": "Markdown"
-                    }
-                )
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                # If Markdown parsing fails, try without formatting
-                logger.warning(f"Markdown parsing failed, sending as plain text: {e}")
-                response = await client.post(
-                    f"{TELEGRAM_API_URL}/sendMessage",
-                    json={"chat_id": chat_id, "text": text}
-                )
-                response.raise_for_status()
-                return response.json()
+                return orjson.loads(response.content)
+            except Exception as fallback_error:
+                logger.error(f"Fallback audio send also failed: {fallback_error}")
+                raise
+    else:
+        # Plain replies (no markdown characters at all) skip parse_mode, so a
+        # stray underscore in a file path can't force a second round-trip
+        if _MARKDOWN_CHARS_RE.search(text) is None:
+            response = await http_client.post(
+                f"{TELEGRAM_API_URL}/sendMessage",
+                content=orjson.dumps({"chat_id": chat_id, "text": text}),
+                headers=_JSON_HEADERS
+            )
+            response.raise_for_status()
+            return orjson.loads(response.content)
+
+        # Send text message with Markdown formatting
+        try:
+            response = await http_client.post(
+                f"{TELEGRAM_API_URL}/sendMessage",
+                content=orjson.dumps({
+                    "chat_id": chat_id,
+                    "text": text,
+                    "parse_mode": "Markdown"
+                }),
+                headers=_JSON_HEADERS
+            )
+            response.raise_for_status()
+            return orjson.loads(response.content)
+        except httpx.HTTPStatusError as e:
+            # If Markdown parsing fails, try without formatting
+            logger.warning(f"Markdown parsing failed, sending as plain text: {e}")
+            response = await http_client.post(
+                f"{TELEGRAM_API_URL}/sendMessage",
+                content=orjson.dumps({"chat_id": chat_id, "text": text}),
+                headers=_JSON_HEADERS
+            )
+            response.raise_for_status()
+            return orjson.loads(response.content)
 
 
 def get_chat_history(chat_id: str) -> List:
     """Retrieve conversation history for a specific chat."""
-    return conversation_history.get(chat_id, [])
+    return list(conversation_history.get(chat_id, ()))
+
+
+def history_from_texts(raw_history: List[str]) -> List:
+    """Rebuild LangChain messages from Redis' alternating human/AI texts."""
+    return [
+        HumanMessage(content=text) if idx % 2 == 0 else AIMessage(content=text)
+        for idx, text in enumerate(raw_history)
+    ]
 
 
 def update_chat_history(chat_id: str, human_msg: str, ai_msg: str):
     """Update conversation history with new messages."""
-    if chat_id not in conversation_history:
-        conversation_history[chat_id] = []
-    
-    conversation_history[chat_id].append(HumanMessage(content=human_msg))
-    conversation_history[chat_id].append(AIMessage(content=ai_msg))
-    
-    # Keep only last 10 exchanges (20 messages)
-    if len(conversation_history[chat_id]) > 20:
-        conversation_history[chat_id] = conversation_history[chat_id][-20:]
+    history = conversation_history[chat_id]
+    history.append(HumanMessage(content=human_msg))
+    history.append(AIMessage(content=ai_msg))
 
 
 @app.get("/")
@@ -965,12 +1196,16 @@ async def clear_memory(user_id: Optional[str] = None):
             del conversation_history[user_id]
         if user_id in processed_messages:
             del processed_messages[user_id]
+        if redis_store.is_available():
+            await redis_store.clear_user(user_id)
         logger.info(f"Cleared memory for user {user_id}")
         return {"status": "success", "message": f"Memory cleared for user {user_id}"}
     else:
         # Clear all users
         conversation_history.clear()
         processed_messages.clear()
+        if redis_store.is_available():
+            await redis_store.clear_all()
         logger.info("Cleared all conversation history and processed messages")
         return {"status": "success", "message": "Memory cleared for all users"}
 
@@ -979,12 +1214,35 @@ async def clear_memory(user_id: Optional[str] = None):
 async def telegram_webhook(request: Request):
     """
     Main webhook endpoint for Telegram.
-    Handles incoming messages (text and audio) and orchestrates the agent.
+    Acknowledges the update immediately and processes it in a background
+    task, so Telegram's webhook timeout never triggers a retry while the
+    agent is still generating.
+    """
+    try:
+        payload = orjson.loads(await request.body())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+
+    # Shed load instead of queueing unboundedly
+    if len(app.state.background_tasks) >= MAX_BACKGROUND_TASKS:
+        logger.warning("Too many in-flight updates, rejecting webhook")
+        raise HTTPException(status_code=503, detail="Server busy, please retry")
+
+    task = asyncio.create_task(process_telegram_update(payload))
+    app.state.background_tasks.add(task)
+    task.add_done_callback(app.state.background_tasks.discard)
+
+    return JSONResponse(content={"status": "accepted"})
+
+
+async def process_telegram_update(payload: dict):
+    """
+    Process a single Telegram update (text, voice, document, photo, video)
+    and orchestrate the agent. Runs as a background task.
     """
     try:
-        payload = await request.json()
         logger.info(f"Received Telegram webhook: {payload}")
-        
+
         # Extract message data
         message = payload.get("message", {})
         chat_id = message.get("chat", {}).get("id")
@@ -992,23 +1250,48 @@ async def telegram_webhook(request: Request):
         message_id = message.get("message_id")
         
         if not chat_id:
-            raise HTTPException(status_code=400, detail="No chat_id in payload")
-        
-        # Check if we've already processed this message
-        if user_id not in processed_messages:
-            processed_messages[user_id] = set()
-        
-        if message_id in processed_messages[user_id]:
-            logger.info(f"Skipping already processed message {message_id} from user {user_id}")
-            return JSONResponse(content={"status": "already_processed"})
-        
-        # Mark this message as processed
-        processed_messages[user_id].add(message_id)
-        
-        # Keep only last 100 message IDs per user to prevent memory bloat
-        if len(processed_messages[user_id]) > 100:
-            processed_messages[user_id] = set(list(processed_messages[user_id])[-100:])
+            logger.warning("No chat_id in payload, dropping update")
+            return
         
+        # Duplicate check + history load: one pipelined Redis round-trip
+        # when configured, otherwise the in-memory dicts
+        use_redis = redis_store.is_available()
+        chat_history = None
+        if use_redis:
+            try:
+                already_processed, raw_history = await redis_store.load_request_state(
+                    user_id, message_id
+                )
+                if already_processed:
+                    logger.info(f"Skipping already processed message {message_id} from user {user_id}")
+                    return
+                chat_history = history_from_texts(raw_history)
+            except Exception as e:
+                logger.warning(f"Redis state unavailable, falling back to memory: {e}")
+                use_redis = False
+
+        if not use_redis:
+            seen_ids = processed_messages[user_id]
+            if message_id in seen_ids:
+                logger.info(f"Skipping already processed message {message_id} from user {user_id}")
+                return
+            
+            # Mark this message as processed, evicting the oldest ID at the cap
+            seen_ids[message_id] = None
+            if len(seen_ids) > PROCESSED_MESSAGES_MAX:
+                seen_ids.popitem(last=False)
+
+        # The in-memory path marks the message as seen immediately; Redis
+        # only marks it when a full turn is saved. Early-return paths below
+        # (size rejections, download failures, /clear) must mark explicitly
+        # or a Telegram retry would reprocess the same message.
+        async def mark_handled():
+            if use_redis:
+                try:
+                    await redis_store.mark_processed(user_id, message_id)
+                except Exception as e:
+                    logger.warning(f"Failed to mark message {message_id} as processed in Redis: {e}")
+
         user_prompt = None
         
         # Handle voice messages
@@ -1016,14 +1299,55 @@ async def telegram_webhook(request: Request):
             voice = message["voice"]
             file_id = voice["file_id"]
             
+            # file_unique_id is stable across forwards/retries; file_id is not
+            audio_key = voice.get("file_unique_id", file_id)
+            
             logger.info(f"Processing voice message from user {user_id}")
             
-            # Get audio file URL
-            audio_url = await get_telegram_file_url(file_id)
+            # Some clients/forwarders attach a ready transcription; when
+            # present there is no reason to run Whisper at all
+            user_prompt = voice.get("transcription")
+            if user_prompt:
+                logger.info("Using client-provided transcription, skipping ASR")
+            
+            # Reuse a cached transcription for resent/forwarded voice notes
+            if user_prompt is None:
+                user_prompt = _transcription_cache.get(audio_key)
+                if user_prompt is not None:
+                    _transcription_cache.move_to_end(audio_key)
+                    logger.info(f"Transcription cache hit for {audio_key}")
+            if user_prompt is None and redis_store.is_available():
+                try:
+                    user_prompt = await redis_store.redis_client.get(f"transcript:{audio_key}")
+                except Exception as e:
+                    logger.warning(f"Transcription cache read failed: {e}")
+            
+            if user_prompt is None:
+                # Get audio file URL
+                audio_url = await get_telegram_file_url(file_id)
+                
+                # Transcribe audio using our tool
+                user_prompt = await transcribe_audio.ainvoke({"audio_file_url": audio_url})
+                
+                # Cache successful transcriptions (error strings start with ❌)
+                if user_prompt and not user_prompt.startswith("❌"):
+                    _transcription_cache[audio_key] = user_prompt
+                    if len(_transcription_cache) > TRANSCRIPTION_CACHE_MAX:
+                        _transcription_cache.popitem(last=False)
+                    if redis_store.is_available():
+                        try:
+                            await redis_store.redis_client.set(
+                                f"transcript:{audio_key}", user_prompt,
+                                ex=TRANSCRIPTION_TTL_SECONDS
+                            )
+                        except Exception as e:
+                            logger.warning(f"Transcription cache write failed: {e}")
             
-            # Transcribe audio using our tool
-            transcription_result = await transcribe_audio.ainvoke({"audio_file_url": audio_url})
-            user_prompt = transcription_result
+            # A caption is accompanying text, not a transcript - append it
+            # to the spoken content rather than replacing it
+            caption = message.get("caption")
+            if caption and user_prompt and not user_prompt.startswith("❌"):
+                user_prompt = f"{user_prompt}\n\nUser's caption: {caption}"
             
             logger.info(f"Transcription: {user_prompt}")
         
@@ -1033,7 +1357,7 @@ async def telegram_webhook(request: Request):
             logger.info(f"Processing text message from user {user_id}: {user_prompt}")
             
             # Check for clear cache command
-            if user_prompt.strip().lower() in ["/clear", "/clear_cache", "clear cache", "clear memory", "forget everything", "reset memory"]:
+            if _CLEAR_COMMAND_RE.match(user_prompt):
                 # Clear conversation history for this user
                 if user_id in conversation_history:
                     del conversation_history[user_id]
@@ -1044,8 +1368,18 @@ async def telegram_webhook(request: Request):
                     del processed_messages[user_id]
                     logger.info(f"Cleared processed messages cache for user {user_id}")
                 
+                if redis_store.is_available():
+                    try:
+                        await redis_store.clear_user(user_id)
+                        logger.info(f"Cleared Redis state for user {user_id}")
+                    except Exception as e:
+                        logger.warning(f"Failed to clear Redis state: {e}")
+                
+                # Mark after clear_user so the /clear message itself isn't
+                # reprocessed on a webhook retry
+                await mark_handled()
                 await send_telegram_message(chat_id, "✅ Memory cleared! I've forgotten our previous conversations. Starting fresh!")
-                return JSONResponse(content={"status": "memory_cleared"})
+                return
         
         # Handle document messages (PDF, DOCX, PPTX, images, etc.)
         elif "document" in message:
@@ -1059,8 +1393,9 @@ async def telegram_webhook(request: Request):
             
             # Check file size (Telegram API limit is 20MB for bots)
             if file_size > 20 * 1024 * 1024:  # 20MB
+                await mark_handled()
                 await send_telegram_message(chat_id, "⚠️ File is too large. Please send files smaller than 20MB.")
-                return JSONResponse(content={"status": "file_too_large"})
+                return
             
             # Supported document types
             supported_types = [
@@ -1075,29 +1410,13 @@ async def telegram_webhook(request: Request):
                 'image/jpg'
             ]
             
-            # Send processing message
-            await send_telegram_message(chat_id, f"📄 Processing {file_name}... Please wait.")
-            
             try:
-                # Download the file from Telegram
-                file_url = await get_telegram_file_url(file_id)
-                
-                # Download to temporary location
-                # Create temp file with original extension
+                # Overlap the "processing" notice with the actual download
                 file_extension = os.path.splitext(file_name)[1]
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=file_extension)
-                temp_file_path = temp_file.name
-                temp_file.close()
-                
-                # Download file
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(file_url)
-                    response.raise_for_status()
-                    
-                    async with aiofiles.open(temp_file_path, 'wb') as f:
-                        await f.write(response.content)
-                
-                logger.info(f"Downloaded file to: {temp_file_path}")
+                _, temp_file_path = await asyncio.gather(
+                    send_telegram_message(chat_id, f"📄 Processing {file_name}... Please wait."),
+                    download_telegram_file(file_id, suffix=file_extension),
+                )
                 
                 # Read the document using our tool
                 document_content = await read_document.ainvoke({"file_path": temp_file_path})
@@ -1119,8 +1438,9 @@ async def telegram_webhook(request: Request):
                 
             except Exception as e:
                 logger.error(f"Failed to process document: {e}", exc_info=True)
+                await mark_handled()
                 await send_telegram_message(chat_id, f"❌ Sorry, I couldn't process this document. Error: {str(e)}")
-                return JSONResponse(content={"status": "document_processing_failed"})
+                return
         
         # Handle photo messages
         elif "photo" in message:
@@ -1131,27 +1451,12 @@ async def telegram_webhook(request: Request):
             
             logger.info(f"Processing photo from user {user_id}")
             
-            # Send processing message
-            await send_telegram_message(chat_id, "📸 Processing image... Please wait.")
-            
             try:
-                # Download the file from Telegram
-                file_url = await get_telegram_file_url(file_id)
-                
-                # Download to temporary location
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".jpg")
-                temp_file_path = temp_file.name
-                temp_file.close()
-                
-                # Download file
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(file_url)
-                    response.raise_for_status()
-                    
-                    async with aiofiles.open(temp_file_path, 'wb') as f:
-                        await f.write(response.content)
-                
-                logger.info(f"Downloaded photo to: {temp_file_path}")
+                # Overlap the "processing" notice with the actual download
+                _, temp_file_path = await asyncio.gather(
+                    send_telegram_message(chat_id, "📸 Processing image... Please wait."),
+                    download_telegram_file(file_id, suffix=".jpg"),
+                )
                 
                 # Get caption if provided
                 caption = message.get("caption", "")
@@ -1166,8 +1471,9 @@ async def telegram_webhook(request: Request):
                 
             except Exception as e:
                 logger.error(f"Failed to download photo: {e}", exc_info=True)
+                await mark_handled()
                 await send_telegram_message(chat_id, f"❌ Sorry, I couldn't download this photo. Error: {str(e)}")
-                return JSONResponse(content={"status": "photo_download_failed"})
+                return
         
         # Handle video messages
         elif "video" in message:
@@ -1180,30 +1486,16 @@ async def telegram_webhook(request: Request):
             
             # Check file size (20MB limit)
             if file_size > 20 * 1024 * 1024:
+                await mark_handled()
                 await send_telegram_message(chat_id, "⚠️ Video is too large. Please send videos smaller than 20MB.")
-                return JSONResponse(content={"status": "video_too_large"})
-            
-            # Send processing message
-            await send_telegram_message(chat_id, "🎥 Processing video... This may take a moment.")
+                return
             
             try:
-                # Download the file from Telegram
-                file_url = await get_telegram_file_url(file_id)
-                
-                # Download to temporary location
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-                temp_file_path = temp_file.name
-                temp_file.close()
-                
-                # Download file
-                async with httpx.AsyncClient(timeout=120.0) as client:
-                    response = await client.get(file_url)
-                    response.raise_for_status()
-                    
-                    async with aiofiles.open(temp_file_path, 'wb') as f:
-                        await f.write(response.content)
-                
-                logger.info(f"Downloaded video to: {temp_file_path}")
+                # Overlap the "processing" notice with the actual download
+                _, temp_file_path = await asyncio.gather(
+                    send_telegram_message(chat_id, "🎥 Processing video... This may take a moment."),
+                    download_telegram_file(file_id, suffix=".mp4", timeout=120.0),
+                )
                 
                 # Get caption if provided
                 caption = message.get("caption", "")
@@ -1218,15 +1510,18 @@ async def telegram_webhook(request: Request):
                 
             except Exception as e:
                 logger.error(f"Failed to download video: {e}", exc_info=True)
+                await mark_handled()
                 await send_telegram_message(chat_id, f"❌ Sorry, I couldn't download this video. Error: {str(e)}")
-                return JSONResponse(content={"status": "video_download_failed"})
+                return
         
         else:
+            await mark_handled()
             await send_telegram_message(chat_id, "Sorry, I can only process text, voice messages, documents (PDF, DOCX, etc.), images, and videos.")
-            return JSONResponse(content={"status": "unsupported_message_type"})
+            return
         
-        # Get conversation history
-        chat_history = get_chat_history(user_id)
+        # Get conversation history (already loaded when Redis handled dedup)
+        if chat_history is None:
+            chat_history = get_chat_history(user_id)
         
         # Load user preferences if this is a fresh conversation (no history)
         user_context = ""
@@ -1247,11 +1542,24 @@ async def telegram_webhook(request: Request):
         if user_context:
             user_prompt = user_context + user_prompt
         
+        # Speculatively start this user's historically most likely first
+        # tool while the LLM decodes; the result is reused only if the agent
+        # issues the same call, otherwise it's cancelled afterwards
+        try:
+            predicted_tool = await tool_prefetch.predict_first_tool(user_id)
+            if predicted_tool == "web_search":
+                tool_prefetch.start_speculation(
+                    user_prompt, web_search.ainvoke({"query": user_prompt})
+                )
+        except Exception as e:
+            logger.warning(f"Tool prefetch failed: {e}")
+
         # Invoke the agent (non-streaming for reliable tool calls)
         logger.info(f"Invoking agent for user {user_id}")
         
-        # Get response from agent
-        result = await agent_executor.ainvoke({
+        # Get response from agent, using only the tool groups this turn needs
+        executor = get_agent_executor(select_tool_groups(user_prompt))
+        result = await executor.ainvoke({
             "input": user_prompt,
             "chat_history": chat_history,
             "user_id": user_id
@@ -1259,6 +1567,18 @@ async def telegram_webhook(request: Request):
         
         full_response = result.get("output", "")
         logger.info(f"Agent response received")
+
+        # Feed the observed tool sequence back into the prefetch model and
+        # drop any speculative work the agent didn't ask for
+        try:
+            tool_sequence = [
+                action.tool for action, _ in result.get("intermediate_steps", [])
+            ]
+            await tool_prefetch.record_transitions(user_id, tool_sequence)
+        except Exception as e:
+            logger.warning(f"Failed to record tool transitions: {e}")
+        finally:
+            tool_prefetch.discard_pending()
         
         final_answer = full_response or "I'm sorry, I couldn't process that."
         logger.info(f"Agent response: {final_answer}")
@@ -1275,8 +1595,15 @@ async def telegram_webhook(request: Request):
                         logger.info(f"Recovered audio file from intermediate steps: {final_answer}")
                         break
         
-        # Update conversation history
-        update_chat_history(user_id, user_prompt, final_answer)
+        # Update conversation history (pipelined single round-trip on Redis)
+        if use_redis:
+            try:
+                await redis_store.save_turn(user_id, message_id, user_prompt, final_answer)
+            except Exception as e:
+                logger.warning(f"Failed to save turn to Redis: {e}")
+                update_chat_history(user_id, user_prompt, final_answer)
+        else:
+            update_chat_history(user_id, user_prompt, final_answer)
         
         # Check if the response is a local audio file path
         if final_answer.strip().endswith(".wav") and os.path.exists(final_answer.strip()):
@@ -1292,10 +1619,12 @@ async def telegram_webhook(request: Request):
             # Send text response back to Telegram
             await send_telegram_message(chat_id, text=final_answer)
         
-        return JSONResponse(content={"status": "success"})
+        return
     
     except Exception as e:
         logger.error(f"Error processing webhook: {str(e)}", exc_info=True)
-        if 'chat_id' in locals():
-            await send_telegram_message(chat_id, "Sorry, an error occurred while processing your request.")
-        raise HTTPException(status_code=500, detail=str(e))
+        if 'chat_id' in locals() and chat_id:
+            try:
+                await send_telegram_message(chat_id, "Sorry, an error occurred while processing your request.")
+            except Exception as send_error:
+                logger.error(f"Failed to send error message: {send_error}")
@@ -0,0 +1,124 @@
+"""
+Redis-backed conversation state for the Telegram webhook.
+Batches the per-request Redis round-trips (dedup check, history load,
+turn saves) into single pipelines so a webhook pays one RTT instead of 3-5.
+"""
+
+import os
+import logging
+from typing import List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+# How many raw messages (2 per exchange) to keep per user
+HISTORY_MAX_MESSAGES = 20
+# How many processed message IDs to remember per user (duplicate suppression)
+PROCESSED_MAX_IDS = 100
+# Expire idle user state after 7 days
+STATE_TTL_SECONDS = 7 * 24 * 3600
+
+# Initialize Redis client (optional - in-memory fallback stays in main.py)
+redis_client = None
+
+try:
+    if REDIS_URL:
+        import redis.asyncio as redis
+
+        redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+        logger.info("Redis memory store initialized successfully")
+    else:
+        logger.info("REDIS_URL not set - using in-memory conversation state")
+except Exception as e:
+    logger.error(f"Failed to initialize Redis memory store: {e}")
+    redis_client = None
+
+
+def is_available() -> bool:
+    """Check whether the Redis-backed store can be used."""
+    return redis_client is not None
+
+
+async def load_request_state(user_id: str, message_id: int) -> Tuple[bool, List[str]]:
+    """
+    Load everything the webhook needs in ONE Redis round-trip.
+
+    Pipelines the duplicate-message check and the history read so we pay
+    a single RTT instead of two.
+
+    Args:
+        user_id: Telegram user ID
+        message_id: Incoming Telegram message ID
+
+    Returns:
+        (already_processed, history) where history is a list of
+        alternating human/AI message texts, oldest first.
+    """
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.sismember(f"seen:{user_id}", str(message_id))
+        pipe.lrange(f"hist:{user_id}", -HISTORY_MAX_MESSAGES, -1)
+        already_processed, history = await pipe.execute()
+
+    return bool(already_processed), history
+
+
+async def save_turn(user_id: str, message_id: int, human_msg: str, ai_msg: str):
+    """
+    Persist one completed exchange in ONE Redis round-trip.
+
+    Pipelines: mark message as processed, trim the seen-set, append both
+    turns to history, trim history, refresh TTLs.
+    """
+    seen_key = f"seen:{user_id}"
+    hist_key = f"hist:{user_id}"
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.sadd(seen_key, str(message_id))
+        # Bound the dedup set; SPOP removes arbitrary members which is fine
+        # for an approximate sliding window of recent message IDs
+        pipe.scard(seen_key)
+        pipe.rpush(hist_key, human_msg, ai_msg)
+        pipe.ltrim(hist_key, -HISTORY_MAX_MESSAGES, -1)
+        pipe.expire(seen_key, STATE_TTL_SECONDS)
+        pipe.expire(hist_key, STATE_TTL_SECONDS)
+        results = await pipe.execute()
+
+    # Trim overgrown dedup sets outside the hot path (rare)
+    seen_count = results[1]
+    if seen_count > PROCESSED_MAX_IDS:
+        await redis_client.spop(seen_key, seen_count - PROCESSED_MAX_IDS)
+
+
+async def mark_processed(user_id: str, message_id: int):
+    """Mark a message as processed without saving a conversation turn."""
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.sadd(f"seen:{user_id}", str(message_id))
+        pipe.expire(f"seen:{user_id}", STATE_TTL_SECONDS)
+        await pipe.execute()
+
+
+async def clear_user(user_id: str):
+    """Delete all conversation state for one user (one round-trip)."""
+    await redis_client.delete(f"seen:{user_id}", f"hist:{user_id}")
+
+
+async def clear_all():
+    """Delete conversation state for all users."""
+    cursor = 0
+    while True:
+        cursor, keys = await redis_client.scan(cursor, match="seen:*", count=500)
+        if keys:
+            await redis_client.delete(*keys)
+        if cursor == 0:
+            break
+    cursor = 0
+    while True:
+        cursor, keys = await redis_client.scan(cursor, match="hist:*", count=500)
+        if keys:
+            await redis_client.delete(*keys)
+        if cursor == 0:
+            break
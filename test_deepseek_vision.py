@@ -1,13 +1,59 @@
 import os
-import base64
-from dotenv import load_dotenv
+import sys
+from pathlib import Path
+# pybase64 encodes 3-8x faster via SIMD; stdlib base64 is the fallback
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
 from langchain_nvidia_ai_endpoints import ChatNVIDIA
-from PIL import Image
+from langchain.globals import set_llm_cache
+from langchain_community.cache import SQLiteCache
+import struct
+import orjson
 import requests
+from requests.adapters import HTTPAdapter, Retry
 
-load_dotenv()
+from config import nvidia_key
 
-NVIDIA_API_KEY = os.getenv("NVIDIA_API_KEY")
+NVIDIA_API_KEY = nvidia_key()
+
+# 100x100 red PNG, precomputed so the test doesn't need PIL (and its ~40ms
+# import plus encoder run) just to synthesize a constant image
+_RED_PNG_B64 = (
+    b"iVBORw0KGgoAAAANSUhEUgAAAGQAAABkCAIAAAD/gAIDAAAAkElEQVR42u3QMQ0AAAjAsPk3"
+    b"DRb4eJpUQZviSIEsWbJkyUKBLFmyZMlCgSxZsmTJQoEsWbJkyUKBLFmyZMlCgSxZsmTJQoEs"
+    b"WbJkyUKBLFmyZMlCgSxZsmTJQoEsWbJkyUKBLFmyZMlCgSxZsmTJQoEsWbJkyUKBLFmyZMlC"
+    b"gSxZsmTJQoEsWbJkyUKBLFnvFp4t6yugc3LNAAAAAElFTkSuQmCC"
+)
+
+# On-disk LLM cache: the deterministic baseline call skips the network on
+# every run after the first
+set_llm_cache(SQLiteCache(database_path=".langchain_test.db"))
+
+# Shared session so repeated calls to integrate.api.nvidia.com reuse one
+# TLS connection instead of handshaking per request
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.3)
+))
+
+# Lazily-built module singleton so re-running the test (or importing it from
+# a harness) reuses one client and its HTTP pool instead of stacking them up
+_LLM = None
+
+
+def _get_llm():
+    global _LLM
+    if _LLM is None:
+        _LLM = ChatNVIDIA(
+            model="deepseek-ai/deepseek-v3.1-terminus",
+            api_key=NVIDIA_API_KEY,
+            temperature=0.3,
+            max_tokens=2048
+        )
+    return _LLM
 
 def test_deepseek_vision():
     """Test if DeepSeek can handle image inputs."""
@@ -15,18 +61,21 @@ def test_deepseek_vision():
     print("Testing DeepSeek Vision Capabilities...")
     print("=" * 60)
     
-    # Initialize DeepSeek model
-    llm = ChatNVIDIA(
-        model="deepseek-ai/deepseek-v3.1-terminus",
-        api_key=NVIDIA_API_KEY,
-        temperature=0.3,
-        max_tokens=2048
-    )
+    # Initialize DeepSeek model (shared singleton)
+    llm = _get_llm()
     
     # Test 1: Text-only (baseline)
     print("\n1. Testing text-only input (baseline):")
     try:
-        response = llm.invoke("What is 2+2?")
+        # temperature=0 makes the baseline deterministic so the SQLite
+        # cache can answer repeat runs without a network call
+        llm_det = ChatNVIDIA(
+            model="deepseek-ai/deepseek-v3.1-terminus",
+            api_key=NVIDIA_API_KEY,
+            temperature=0,
+            max_tokens=2048
+        )
+        response = llm_det.invoke("What is 2+2?")
         print(f"✅ Text response: {response.content[:100]}...")
     except Exception as e:
         print(f"❌ Text test failed: {e}")
@@ -34,17 +83,26 @@ def test_deepseek_vision():
     # Test 2: Try image with base64 (OpenAI format)
     print("\n2. Testing image input (base64 format):")
     try:
-        # Create a simple test image or use existing screenshot
+        # Use the existing screenshot; fall back to the embedded test image.
+        # EAFP: one open instead of an exists() stat followed by a read
         test_image_path = "browser_screenshot.png"
         
-        if not os.path.exists(test_image_path):
-            # Create a simple test image
-            img = Image.new('RGB', (100, 100), color='red')
-            img.save(test_image_path)
+        try:
+            raw = Path(test_image_path).read_bytes()
+        except FileNotFoundError:
+            raw = base64.b64decode(_RED_PNG_B64)
+            Path(test_image_path).write_bytes(raw)
             print(f"Created test image: {test_image_path}")
         
-        with open(test_image_path, 'rb') as img_file:
-            image_data = base64.b64encode(img_file.read()).decode('utf-8')
+        try:
+            width, height = struct.unpack(">II", raw[16:24])
+            print(f"Test image: {test_image_path} ({width}x{height})")
+        except struct.error as e:
+            print(f"Could not read PNG header: {e}")
+
+        # Encode once; tests 2 and 3 reuse the same data URL
+        image_data = base64.b64encode(raw).decode('utf-8')
+        data_url = f"data:image/png;base64,{image_data}"
         
         # Try OpenAI-style multimodal input
         messages = [
@@ -55,15 +113,22 @@ def test_deepseek_vision():
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/png;base64,{image_data}"
+                            "url": data_url
                         }
                     }
                 ]
             }
         ]
         
-        response = llm.invoke(messages)
-        print(f"✅ Vision response: {response.content[:200]}...")
+        sys.stdout.write("✅ Vision response: ")
+        buf = []
+        for chunk in llm.stream(messages):
+            sys.stdout.write(chunk.content)
+            sys.stdout.flush()
+            buf.append(chunk.content)
+        print()
+        if not "".join(buf).strip():
+            raise ValueError("empty streamed response")
         print("✅ DeepSeek supports vision!")
         return True
         
@@ -74,9 +139,6 @@ def test_deepseek_vision():
     # Test 3: Try direct API call to confirm
     print("\n3. Testing via direct NVIDIA API:")
     try:
-        with open(test_image_path, 'rb') as img_file:
-            image_data = base64.b64encode(img_file.read()).decode('utf-8')
-        
         headers = {
             "Authorization": f"Bearer {NVIDIA_API_KEY}",
             "Content-Type": "application/json"
@@ -92,7 +154,7 @@ def test_deepseek_vision():
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/png;base64,{image_data}"
+                                "url": data_url
                             }
                         }
                     ]
@@ -102,15 +164,15 @@ def test_deepseek_vision():
             "temperature": 0.3
         }
         
-        response = requests.post(
+        response = _SESSION.post(
             "https://integrate.api.nvidia.com/v1/chat/completions",
             headers=headers,
-            json=payload,
+            data=orjson.dumps(payload),
             timeout=30
         )
         
         if response.status_code == 200:
-            result = response.json()
+            result = orjson.loads(response.content)
             content = result['choices'][0]['message']['content']
             print(f"✅ Direct API vision response: {content[:200]}...")
             print("✅ DeepSeek DOES support vision via direct API!")
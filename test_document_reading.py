@@ -3,6 +3,8 @@ Test script for document reading functionality
 """
 import asyncio
 from tools import read_document
+from test_utils import ask as _ask
+
 
 async def test_document_reading():
     """Test the read_document tool"""
@@ -12,7 +14,10 @@ async def test_document_reading():
     print("="*60)
     
     # Test with a sample path (you can replace this with an actual file path)
-    test_file = input("\nEnter the full path to a document to test (PDF, DOCX, PPTX, TXT, etc.):\n> ")
+    test_file = _ask(
+        "A_MAC_DOC_PATH",
+        "\nEnter the full path to a document to test (PDF, DOCX, PPTX, TXT, etc.):\n> "
+    )
     
     if not test_file.strip():
         print("\nNo file path provided. Using example path...")
@@ -21,10 +26,26 @@ async def test_document_reading():
     print(f"\nReading document: {test_file}\n")
     print("-"*60)
     
-    result = await read_document(test_file)
-    
-    print(result)
+    if test_file.lower().endswith(".pdf"):
+        # Stream PDFs page by page: memory stays O(one page) and output
+        # starts with the first page instead of after the whole parse
+        async for chunk in read_document_stream(test_file):
+            print(chunk, end="")
+        print()
+    else:
+        result = await read_document(test_file)
+        print(result)
     print("\n" + "="*60)
 
+
+async def read_document_stream(path):
+    """Yield extracted text per PDF page via pypdf's lazy page iterator."""
+    from pypdf import PdfReader
+
+    loop = asyncio.get_running_loop()
+    reader = await loop.run_in_executor(None, PdfReader, path)
+    for page in reader.pages:
+        yield await loop.run_in_executor(None, page.extract_text)
+
 if __name__ == "__main__":
     asyncio.run(test_document_reading())
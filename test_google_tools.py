@@ -4,7 +4,7 @@ Use this to verify tools work independently
 """
 
 import asyncio
-import sys
+from test_utils import ask as _ask
 from google_tools import (
     search_google_contacts,
     get_all_google_contacts,
@@ -15,30 +15,43 @@ from google_tools import (
     read_google_sheet
 )
 
+# Concurrency governor sized to Google per-user quotas: fan-out never
+# bursts more than five API calls at once, so we don't trade the gather
+# speedup back in 429 retries
+_GSEM = asyncio.Semaphore(5)
+
+
+async def _bounded(coro):
+    async with _GSEM:
+        return await coro
+
+
 async def test_contacts():
     print("\n" + "=" * 70)
     print("TESTING: Google Contacts")
     print("=" * 70)
     
-    # Test 1: List all contacts
+    # The three calls are independent People API round trips - issue them
+    # together and print the results in order once all have returned
+    list_result, search_result, add_result = await asyncio.gather(
+        _bounded(get_all_google_contacts.ainvoke({"max_results": 5})),
+        _bounded(search_google_contacts.ainvoke({"query": "test"})),
+        _bounded(add_google_contact.ainvoke({
+            "first_name": "Test",
+            "last_name": "Contact",
+            "email": "test@example.com",
+            "phone": "+1234567890"
+        }))
+    )
+
     print("\n📋 Test 1: List all contacts...")
-    result = await get_all_google_contacts.ainvoke({"max_results": 5})
-    print(result)
-    
-    # Test 2: Search contacts
+    print(list_result)
+
     print("\n🔍 Test 2: Search contacts for 'test'...")
-    result = await search_google_contacts.ainvoke({"query": "test"})
-    print(result)
-    
-    # Test 3: Add contact
+    print(search_result)
+
     print("\n➕ Test 3: Add test contact...")
-    result = await add_google_contact.ainvoke({
-        "first_name": "Test",
-        "last_name": "Contact",
-        "email": "test@example.com",
-        "phone": "+1234567890"
-    })
-    print(result)
+    print(add_result)
 
 async def test_docs():
     print("\n" + "=" * 70)
@@ -54,7 +67,7 @@ async def test_docs():
     print(result)
     
     # Test 2: Read document (you'll need to provide a doc ID)
-    doc_id = input("\n📖 Test 2: Enter a Google Doc ID to read (or press Enter to skip): ").strip()
+    doc_id = _ask("A_MAC_DOC_ID", "\n📖 Test 2: Enter a Google Doc ID to read (or press Enter to skip): ")
     if doc_id:
         result = await read_google_doc.ainvoke({"doc_id": doc_id})
         print(result)
@@ -79,7 +92,7 @@ async def test_sheets():
     print(result)
     
     # Test 2: Read spreadsheet
-    sheet_id = input("\n📖 Test 2: Enter a Google Sheet ID to read (or press Enter to skip): ").strip()
+    sheet_id = _ask("A_MAC_SHEET_ID", "\n📖 Test 2: Enter a Google Sheet ID to read (or press Enter to skip): ")
     if sheet_id:
         result = await read_google_sheet.ainvoke({"sheet_id": sheet_id, "range_name": "Sheet1"})
         print(result)
@@ -108,13 +121,27 @@ async def main():
     print("3. Google Sheets (create, read)")
     print("all. Run all tests")
     
-    choice = input("\nEnter choice (1/2/3/all): ").strip().lower()
-    
+    choice = _ask("A_MAC_GOOGLE_TEST_CHOICE", "\nEnter choice (1/2/3/all): ").lower()
+
+    # Warm the OAuth credentials once up front - googleapiclient builds its
+    # own HTTP transport per service, so the shareable cost across suites is
+    # the token load/refresh, not the socket
+    from google_tools import get_google_credentials
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, get_google_credentials)
+    except Exception as e:
+        print(f"⚠️ Could not pre-warm Google credentials: {e}")
+
     try:
         if choice == 'all':
-            await test_contacts()
-            await test_docs()
-            await test_sheets()
+            # Run the three suites concurrently - their latency is network
+            # RTTs, so total wall-clock drops to roughly the slowest suite.
+            # TaskGroup (3.11+) propagates failures with full tracebacks,
+            # and the semaphore keeps total API concurrency under quota
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(test_contacts())
+                tg.create_task(test_docs())
+                tg.create_task(test_sheets())
         elif choice in tests and tests[choice][1]:
             await tests[choice][1]()
         else:
@@ -0,0 +1,16 @@
+"""
+Shared helpers for the standalone test scripts.
+"""
+
+import os
+import sys
+
+
+def ask(env_var, prompt, default=""):
+    """Resolve a test input from an env var, asking on stdin only for a TTY."""
+    value = os.environ.get(env_var)
+    if value is not None:
+        return value.strip()
+    if sys.stdin.isatty():
+        return input(prompt).strip()
+    return default
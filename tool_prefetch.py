@@ -0,0 +1,145 @@
+"""
+Speculative tool prefetch for the agent.
+Tracks per-user tool-call sequences and, when a user's history makes the
+first tool call highly predictable, starts that tool in parallel with the
+LLM decode. If the agent then asks for the same call, the result is
+already there; otherwise the speculative task is discarded.
+"""
+
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import redis_store
+
+logger = logging.getLogger(__name__)
+
+# Virtual "previous tool" for the first call of a turn
+START = "<start>"
+
+# Only read-only, idempotent tools whose single argument can plausibly be
+# taken from the raw user message are safe to fire speculatively
+PREFETCHABLE_TOOLS = {"web_search"}
+
+# Don't speculate until the prediction is both well-supported and confident
+MIN_OBSERVATIONS = 5
+CONFIDENCE_THRESHOLD = 0.6
+
+NGRAM_TTL_SECONDS = 30 * 24 * 3600
+
+# In-memory fallback when Redis is not configured
+_transitions: Dict[str, Counter] = defaultdict(Counter)
+
+# Speculative tasks keyed by the exact argument they were started with
+_pending: Dict[str, asyncio.Task] = {}
+
+
+async def record_transitions(user_id: str, tool_sequence: List[str]):
+    """Record observed prev-tool -> next-tool transitions for a user."""
+    if not tool_sequence:
+        return
+
+    pairs = list(zip([START] + tool_sequence, tool_sequence))
+
+    if redis_store.is_available():
+        try:
+            async with redis_store.redis_client.pipeline(transaction=False) as pipe:
+                for prev, nxt in pairs:
+                    key = f"ngrams:{user_id}:{prev}"
+                    pipe.zincrby(key, 1, nxt)
+                    pipe.expire(key, NGRAM_TTL_SECONDS)
+                await pipe.execute()
+            return
+        except Exception as e:
+            logger.warning(f"Failed to record tool transitions in Redis: {e}")
+
+    for prev, nxt in pairs:
+        _transitions[f"{user_id}:{prev}"][nxt] += 1
+
+
+async def predict_first_tool(user_id: str) -> Optional[str]:
+    """
+    Predict the most likely first tool for this user's next turn.
+    Returns the tool name only when the prediction is confident enough
+    and the tool is safe to prefetch, otherwise None.
+    """
+    observed = None
+
+    if redis_store.is_available():
+        try:
+            entries = await redis_store.redis_client.zrevrange(
+                f"ngrams:{user_id}:{START}", 0, -1, withscores=True
+            )
+            if entries:
+                observed = {member: int(score) for member, score in entries}
+        except Exception as e:
+            logger.warning(f"Failed to read tool transitions from Redis: {e}")
+
+    if observed is None:
+        counter = _transitions.get(f"{user_id}:{START}")
+        if not counter:
+            return None
+        observed = dict(counter)
+
+    total = sum(observed.values())
+    if total < MIN_OBSERVATIONS:
+        return None
+
+    tool, count = max(observed.items(), key=lambda kv: kv[1])
+    if tool in PREFETCHABLE_TOOLS and count / total > CONFIDENCE_THRESHOLD:
+        logger.info(
+            f"Predicted first tool '{tool}' for user {user_id} "
+            f"({count}/{total} = {count / total:.0%} confidence)"
+        )
+        return tool
+
+    return None
+
+
+def start_speculation(arg: str, coro):
+    """Start a speculative tool call keyed by its exact argument."""
+    key = arg.strip()
+    if key in _pending:
+        # Close the unused coroutine so it doesn't warn about never
+        # being awaited
+        coro.close()
+        return
+    _pending[key] = asyncio.create_task(coro)
+    logger.info(f"Started speculative tool call for: {key[:80]}")
+
+
+async def take_result(arg: str) -> Optional[str]:
+    """
+    Consume the speculative result for an exact argument match, if any.
+    Returns None (and lets the caller do the real call) on mismatch,
+    cancellation, or speculative failure.
+    """
+    key = arg.strip()
+    task = _pending.get(key)
+    if task is None:
+        return None
+    if task is asyncio.current_task():
+        # The speculative task is the tool call itself, so it reaches this
+        # check while running. It must do the real work (a task can't await
+        # itself); the entry stays pending for the agent's own call to
+        # consume or for discard_pending to cancel.
+        return None
+    del _pending[key]
+    if task.cancelled():
+        return None
+    try:
+        result = await task
+        logger.info("Speculative tool result matched and reused")
+        return result
+    except Exception as e:
+        logger.warning(f"Speculative tool call failed: {e}")
+        return None
+
+
+def discard_pending():
+    """Cancel and drop any speculative tasks the agent never asked for."""
+    for key, task in list(_pending.items()):
+        if not task.done():
+            task.cancel()
+    _pending.clear()
@@ -1,17 +1,30 @@
 from langchain.tools import tool
 from azure.cosmos import CosmosClient, PartitionKey, exceptions
 import httpx
+import io
 import os
+import hashlib
+import time
 import logging
 from typing import Dict, Any, Optional
 import uuid
+from collections import OrderedDict
+from functools import cache, partial
 from datetime import datetime
 from dotenv import load_dotenv
+import itertools
+import threading
+import grpc
 import riva.client
 from riva.client.auth import Auth
+from riva.client.proto import riva_asr_pb2, riva_asr_pb2_grpc
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import base64
 import tempfile
 import wave
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
 from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_community.tools.gmail.utils import build_resource_service, get_gmail_credentials
 from langchain_community.tools.gmail.create_draft import GmailCreateDraft
@@ -26,13 +39,59 @@ from browser_tools import browser_tools_list
 from browser_agent import execute_browser_task
 # Document processing imports
 from unstructured.partition.auto import partition
+try:
+    from unstructured.documents.elements import (
+        Title, Header, NarrativeText, Text, ListItem, Table,
+    )
+    # Seed the category map with the common concrete classes so most
+    # elements never hit the substring fallback at all
+    _ELEMENT_CATEGORY_MAP = {
+        Title: 'titles',
+        Header: 'headings',
+        NarrativeText: 'text',
+        Text: 'text',
+        ListItem: 'lists',
+        Table: 'tables',
+    }
+except ImportError:
+    _ELEMENT_CATEGORY_MAP = {}
 from pathlib import Path
+import redis_store
+import tool_prefetch
 
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Gmail caps one batch HTTP request at 100 calls
+_GMAIL_BATCH_LIMIT = 100
+
+# Cosmos transactional batches are capped at 100 operations per partition
+_COSMOS_BATCH_LIMIT = 100
+
+# Pre-bound so hot Cosmos paths skip the module-attribute lookup per call
+_utcnow = datetime.utcnow
+
+# Dedicated pool for blocking Google/Riva/Cosmos calls. The loop's default
+# executor is small and shared with everything else in the process, so a
+# burst of email + calendar + transcription work would serialize behind it
+# and starve unrelated tasks.
+_BLOCKING_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix="tools-blocking")
+
+# Shared pooled HTTP client - audio downloads reuse keepalive connections
+# to Telegram's CDN instead of paying a TLS handshake per transcription
+HTTP_CLIENT = httpx.AsyncClient(
+    timeout=30.0,
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+)
+
+
+async def aclose_http_client():
+    """Close the shared HTTP client (called from the app's shutdown hook)."""
+    await HTTP_CLIENT.aclose()
+
+
 # Environment variables
 NVIDIA_API_KEY = os.getenv("NVIDIA_API_KEY")
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
@@ -44,62 +103,164 @@ COSMOS_KEY = os.getenv("COSMOS_KEY")
 COSMOS_DATABASE_NAME = os.getenv("COSMOS_DATABASE_NAME", "ai_agent_db")
 COSMOS_CONTAINER_NAME = os.getenv("COSMOS_CONTAINER_NAME", "user_data")
 
-# Initialize Cosmos DB client
-cosmos_client = None
-database = None
-container = None
+# Identical web searches inside the agent's reasoning window are served
+# from this bounded TTL-LRU instead of re-billing Tavily
+_search_cache: OrderedDict = OrderedDict()
+SEARCH_CACHE_MAX_ENTRIES = 256
+SEARCH_CACHE_TTL_SECONDS = 300
 
-try:
-    cosmos_client = CosmosClient(COSMOS_ENDPOINT, COSMOS_KEY)
-    database = cosmos_client.create_database_if_not_exists(id=COSMOS_DATABASE_NAME)
-    container = database.create_container_if_not_exists(
-        id=COSMOS_CONTAINER_NAME,
-        partition_key=PartitionKey(path="/user_id")
-        # Removed offer_throughput - not supported on serverless accounts
-    )
-    logger.info("Cosmos DB initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize Cosmos DB: {e}")
+# Short-lived caches over read-only Google views: repeated email searches
+# and calendar listings inside a one-minute window skip the network.
+# Writes (create_calendar_event) invalidate the calendar cache.
+_email_search_cache: OrderedDict = OrderedDict()
+_calendar_list_cache: OrderedDict = OrderedDict()
+GOOGLE_READ_CACHE_MAX_ENTRIES = 128
+GOOGLE_READ_CACHE_TTL_SECONDS = 60
 
+# How long parsed document text stays cached in Redis
+DOC_CACHE_TTL_SECONDS = 86400
+# In-process LRU over parsed documents - serves repeat reads even when
+# Redis is not configured, and skips a network hop when it is
+_doc_cache: OrderedDict = OrderedDict()
+DOC_CACHE_MAX_ENTRIES = 64
+DOC_CACHE_MAX_RESULT_CHARS = 200_000
+# Rejected before Unstructured ever opens the file
+DOC_MAX_FILE_BYTES = 50 * 1024 * 1024
+DOC_SUPPORTED_EXTENSIONS = frozenset({
+    'pdf', 'docx', 'doc', 'pptx', 'ppt', 'xlsx', 'txt', 'md', 'rst',
+    'html', 'htm', 'xml', 'json', 'csv', 'tsv', 'eml', 'msg',
+    'jpg', 'jpeg', 'png', 'tiff', 'bmp', 'heic',
+})
 
-# Initialize NVIDIA Riva ASR with correct auth and function ID
-riva_asr_service = None
-riva_tts_service = None
+# Parameterized Cosmos queries, hoisted so the SDK can reuse its compiled
+# query plan and no f-string is rebuilt per call
+_PREFERENCES_QUERY = "SELECT * FROM c WHERE c.user_id = @user_id AND c.type = 'preference'"
+_NOTES_QUERY = (
+    "SELECT * FROM c WHERE c.user_id = @user_id AND c.type = 'note' "
+    "ORDER BY c.created_at DESC OFFSET 0 LIMIT @limit"
+)
 
-try:
-    # Create auth for ASR (Whisper) with its specific function ID
-    riva_asr_auth = Auth(
-        ssl_cert=None,
-        use_ssl=True,
-        uri="grpc.nvcf.nvidia.com:443",
-        metadata_args=[
-            ["authorization", f"Bearer {NVIDIA_API_KEY}"],
-            ["function-id", "b702f636-f60c-4a3d-a6f4-f3568c13bd7d"]  # Whisper ASR
-        ]
-    )
-    
-    riva_asr_service = riva.client.ASRService(riva_asr_auth)
-    logger.info("NVIDIA Riva ASR initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize NVIDIA Riva ASR: {e}")
+# Cosmos DB is initialized lazily: create_database/container_if_not_exists
+# are network round trips that shouldn't tax module import or worker forks.
+# @cache makes the outcome (including a logged failure -> None) sticky.
+@cache
+def _get_container():
+    """Create the Cosmos client/database/container on first use."""
+    try:
+        cosmos_client = CosmosClient(COSMOS_ENDPOINT, COSMOS_KEY)
+        database = cosmos_client.create_database_if_not_exists(id=COSMOS_DATABASE_NAME)
+        container = database.create_container_if_not_exists(
+            id=COSMOS_CONTAINER_NAME,
+            partition_key=PartitionKey(path="/user_id")
+            # Removed offer_throughput - not supported on serverless accounts
+        )
+        logger.info("Cosmos DB initialized successfully")
+        return container
+    except Exception as e:
+        logger.error(f"Failed to initialize Cosmos DB: {e}")
+        return None
 
-# Initialize manual TTS client with correct function ID
-try:
-    TTS_FUNCTION_ID = "877104f7-e885-42b9-8de8-f6e4c6303969"  # Magpie TTS
-    tts_auth = Auth(
+
+# Initialize NVIDIA Riva ASR/TTS with correct auth and function IDs.
+# Each Auth owns one gRPC channel; a small pool of services round-robined
+# per call keeps concurrent transcribe/TTS RPCs from serializing behind a
+# single HTTP/2 connection's flow control
+RIVA_CHANNEL_POOL_SIZE = 4
+
+ASR_FUNCTION_ID = "b702f636-f60c-4a3d-a6f4-f3568c13bd7d"  # Whisper ASR
+TTS_FUNCTION_ID = "877104f7-e885-42b9-8de8-f6e4c6303969"  # Magpie TTS
+
+_riva_lock = threading.Lock()
+
+
+def _riva_auth(function_id: str) -> Auth:
+    return Auth(
         ssl_cert=None,
         use_ssl=True,
         uri="grpc.nvcf.nvidia.com:443",
         metadata_args=[
             ["authorization", f"Bearer {NVIDIA_API_KEY}"],
-            ["function-id", TTS_FUNCTION_ID]
+            ["function-id", function_id]
         ]
     )
-    riva_tts_service = riva.client.SpeechSynthesisService(tts_auth)
-    logger.info("Manual Riva TTS client initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize manual Riva TTS client: {e}", exc_info=True)
-    riva_tts_service = None
+
+
+# Channel pools are built on first use so import doesn't pay four gRPC
+# auth setups per direction; @cache keeps the pool (or a failure) sticky
+@cache
+def _get_asr_services() -> tuple:
+    try:
+        services = tuple(
+            riva.client.ASRService(_riva_auth(ASR_FUNCTION_ID))
+            for _ in range(RIVA_CHANNEL_POOL_SIZE)
+        )
+        logger.info("NVIDIA Riva ASR initialized successfully")
+        return services
+    except Exception as e:
+        logger.error(f"Failed to initialize NVIDIA Riva ASR: {e}")
+        return ()
+
+
+@cache
+def _get_tts_services() -> tuple:
+    try:
+        services = tuple(
+            riva.client.SpeechSynthesisService(_riva_auth(TTS_FUNCTION_ID))
+            for _ in range(RIVA_CHANNEL_POOL_SIZE)
+        )
+        logger.info("Manual Riva TTS client initialized successfully")
+        return services
+    except Exception as e:
+        logger.error(f"Failed to initialize manual Riva TTS client: {e}", exc_info=True)
+        return ()
+
+# Native-async ASR: gRPC stub over grpc.aio awaits the RPC on the event
+# loop directly, so transcriptions don't occupy executor threads. Built
+# lazily because aio channels belong to the running loop.
+_aio_asr_stub = None
+
+
+def _get_aio_asr_stub():
+    global _aio_asr_stub
+    if _aio_asr_stub is None:
+        channel = grpc.aio.secure_channel(
+            "grpc.nvcf.nvidia.com:443",
+            grpc.ssl_channel_credentials(),
+            options=[("grpc.keepalive_time_ms", 30000)],
+        )
+        _aio_asr_stub = riva_asr_pb2_grpc.RivaSpeechRecognitionStub(channel)
+    return _aio_asr_stub
+
+
+# Fixed ASR settings - build the protobuf once instead of paying field
+# validation and descriptor lookups on every transcription
+_ASR_CONFIG = riva.client.RecognitionConfig(
+    language_code="en",  # Use "en" not "en-US"
+    max_alternatives=1,
+    enable_automatic_punctuation=True,
+    audio_channel_count=1
+)
+
+_asr_cycle = None
+_tts_cycle = None
+
+
+def _next_asr_service():
+    """Round-robin over the pooled ASR channels (thread-safe)."""
+    global _asr_cycle
+    with _riva_lock:
+        if _asr_cycle is None:
+            _asr_cycle = itertools.cycle(_get_asr_services())
+        return next(_asr_cycle)
+
+
+def _next_tts_service():
+    """Round-robin over the pooled TTS channels (thread-safe)."""
+    global _tts_cycle
+    with _riva_lock:
+        if _tts_cycle is None:
+            _tts_cycle = itertools.cycle(_get_tts_services())
+        return next(_tts_cycle)
 
 # Initialize Tavily Search tool
 tavily_search = None
@@ -124,7 +285,8 @@ except Exception as e:
 gmail_service = None
 calendar_service = None
 # Use the same comprehensive scopes as google_tools.py
-SCOPES = [
+# A tuple keeps the scope set immutable and hashable for credential checks
+SCOPES = (
     # Gmail
     'https://www.googleapis.com/auth/gmail.send',
     'https://www.googleapis.com/auth/gmail.readonly',
@@ -147,34 +309,99 @@ SCOPES = [
     'https://www.googleapis.com/auth/drive.readonly',
     # YouTube Data API
     'https://www.googleapis.com/auth/youtube.readonly',
-]
+)
 
-try:
-    creds = None
-    # Check if token.pickle exists
-    if os.path.exists(GOOGLE_TOKEN_PATH):
-        with open(GOOGLE_TOKEN_PATH, 'rb') as token:
-            creds = pickle.load(token)
+# Credential acquisition is deferred to first use: the OAuth flow can call
+# flow.run_local_server() and block on a browser login, which must never
+# happen during module import. An asyncio.Lock serializes concurrent first
+# callers so the flow runs at most once.
+_google_init_lock = asyncio.Lock()
+
+
+def _load_google_token():
+    """Load the saved OAuth token, migrating legacy pickle files to JSON."""
+    try:
+        return Credentials.from_authorized_user_file(GOOGLE_TOKEN_PATH, SCOPES)
+    except FileNotFoundError:
+        return None
+    except (ValueError, UnicodeDecodeError):
+        # Legacy pickle token from older versions: load it once and re-save
+        # as JSON so the slow/unsafe path never runs again
+        try:
+            with open(GOOGLE_TOKEN_PATH, 'rb') as token:
+                creds = pickle.load(token)
+            with open(GOOGLE_TOKEN_PATH, 'w') as token:
+                token.write(creds.to_json())
+            logger.info("Migrated legacy pickle token to JSON")
+            return creds
+        except Exception as e:
+            logger.warning(f"Could not read legacy token file: {e}")
+            return None
+
+
+def _init_google_services_blocking():
+    """Load/refresh Google credentials and build Gmail + Calendar services."""
+    creds = _load_google_token()
     
     # If there are no valid credentials, let the user log in
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
             creds.refresh(Request())
         else:
+            # Never open an interactive browser flow inside a server worker
+            if not os.getenv("ALLOW_OAUTH_FLOW"):
+                raise RuntimeError(
+                    "No valid Google token; set ALLOW_OAUTH_FLOW=1 and run "
+                    "interactively to authorize"
+                )
             flow = InstalledAppFlow.from_client_secrets_file(
                 GOOGLE_CREDENTIALS_PATH, SCOPES)
             creds = flow.run_local_server(port=0)
         
-        # Save the credentials for the next run
-        with open(GOOGLE_TOKEN_PATH, 'wb') as token:
-            pickle.dump(creds, token)
+        # Save the credentials for the next run (JSON: tiny, fast, no
+        # arbitrary-code-execution hazard on load)
+        with open(GOOGLE_TOKEN_PATH, 'w') as token:
+            token.write(creds.to_json())
     
-    # Build services
-    gmail_service = build('gmail', 'v1', credentials=creds)
-    calendar_service = build('calendar', 'v3', credentials=creds)
-    logger.info("Gmail and Calendar services initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize Gmail/Calendar services: {e}")
+    # static_discovery uses the discovery docs bundled with the client and
+    # cache_discovery=False skips the legacy discovery cache, so building a
+    # service costs no network round trip
+    return (
+        build('gmail', 'v1', credentials=creds,
+              cache_discovery=False, static_discovery=True),
+        build('calendar', 'v3', credentials=creds,
+              cache_discovery=False, static_discovery=True),
+    )
+
+
+async def _ensure_google_services():
+    """Initialize Gmail/Calendar services on first use (fast no-op after)."""
+    global gmail_service, calendar_service
+    if gmail_service is not None:
+        return
+    async with _google_init_lock:
+        if gmail_service is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+            gmail_service, calendar_service = await loop.run_in_executor(
+                _BLOCKING_POOL, _init_google_services_blocking
+            )
+            logger.info("Gmail and Calendar services initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to initialize Gmail/Calendar services: {e}")
+
+
+async def get_gmail_service():
+    """Return the shared Gmail service, initializing lazily on first call."""
+    await _ensure_google_services()
+    return gmail_service
+
+
+async def get_calendar_service():
+    """Return the shared Calendar service, initializing lazily on first call."""
+    await _ensure_google_services()
+    return calendar_service
 
 
 @tool
@@ -189,51 +416,51 @@ async def transcribe_audio(audio_file_url: str) -> str:
         The transcribed text
     """
     try:
-        if not riva_asr_service:
+        if not _get_asr_services():
             return "Error: NVIDIA Riva ASR not initialized"
         
         logger.info(f"Transcribing audio from: {audio_file_url}")
         
-        # Download audio file
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(audio_file_url)
-            response.raise_for_status()
-            audio_data = response.content
-        
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".oga") as temp_file:
-            temp_file.write(audio_data)
-            temp_file_path = temp_file.name
-        
-        logger.info(f"Audio downloaded to: {temp_file_path}")
-        
-        # Configure ASR with correct language code
-        config = riva.client.RecognitionConfig(
-            language_code="en",  # Use "en" not "en-US"
-            max_alternatives=1,
-            enable_automatic_punctuation=True,
-            audio_channel_count=1
-        )
-        
-        # Transcribe using Riva ASR
-        loop = asyncio.get_event_loop()
-        
-        def transcribe_sync():
-            with open(temp_file_path, 'rb') as audio_file:
-                audio_bytes = audio_file.read()
-                response = riva_asr_service.offline_recognize(audio_bytes, config)
+        # Download audio file over the shared pooled client
+        response = await HTTP_CLIENT.get(audio_file_url)
+        response.raise_for_status()
+        audio_data = response.content
+
+        logger.info(f"Audio downloaded: {len(audio_data)} bytes")
+
+        # Transcribe using Riva ASR - the downloaded bytes go straight to
+        # the Recognize RPC, no temp-file write/read round-trip needed.
+        # Prefer the grpc.aio stub (awaits on the event loop, no executor
+        # thread held for the whole inference); fall back to the pooled
+        # sync services if the async path fails
+        transcription = None
+        try:
+            request = riva_asr_pb2.RecognizeRequest(config=_ASR_CONFIG, audio=audio_data)
+            response = await _get_aio_asr_stub().Recognize(
+                request,
+                metadata=(
+                    ("authorization", f"Bearer {NVIDIA_API_KEY}"),
+                    ("function-id", ASR_FUNCTION_ID),
+                ),
+            )
+            if response.results and len(response.results) > 0:
+                transcription = response.results[0].alternatives[0].transcript
+            else:
+                transcription = ""
+        except Exception as aio_error:
+            logger.warning(f"Async ASR path failed, using sync fallback: {aio_error}")
+
+            loop = asyncio.get_running_loop()
+            asr_service = _next_asr_service()
+
+            def transcribe_sync():
+                response = asr_service.offline_recognize(audio_data, _ASR_CONFIG)
                 if response.results and len(response.results) > 0:
                     return response.results[0].alternatives[0].transcript
                 return ""
-        
-        transcription = await loop.run_in_executor(None, transcribe_sync)
-        
-        # Clean up temporary file
-        try:
-            os.remove(temp_file_path)
-        except Exception as e:
-            logger.warning(f"Could not delete temp file: {e}")
-        
+
+            transcription = await loop.run_in_executor(_BLOCKING_POOL, transcribe_sync)
+
         logger.info(f"Transcription successful: {transcription[:100] if transcription else 'empty'}...")
         return transcription if transcription else "Could not transcribe audio"
     
@@ -256,7 +483,7 @@ async def convert_text_to_speech(text_to_speak: str) -> str:
         Local file path of the generated audio file (this is your final answer)
     """
     try:
-        if not riva_tts_service:
+        if not _get_tts_services():
             return "Error: Manual Riva TTS client is not initialized"
         
         logger.info(f"Converting text to speech (Manual): {text_to_speak[:100]}...")
@@ -266,28 +493,32 @@ async def convert_text_to_speech(text_to_speak: str) -> str:
         local_file_path = os.path.join(os.getcwd(), filename)
         
         # Use the Riva client's synthesize method directly
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         
+        tts_service = _next_tts_service()
+
         def synthesize_sync():
-            # synthesize() returns a single response object with raw audio data
-            response = riva_tts_service.synthesize(
+            # synthesize_online() streams audio chunks as they are produced:
+            # memory stays bounded for long utterances and disk writing
+            # overlaps synthesis instead of waiting for the full response
+            responses = tts_service.synthesize_online(
                 text=text_to_speak,
                 voice_name="Magpie-Multilingual.EN-US.Mia",
                 language_code="en-US",
                 sample_rate_hz=22050
             )
             
-            # Write the raw audio data as a proper WAV file with header
             with wave.open(local_file_path, 'wb') as wav_file:
                 # Set WAV file parameters
                 wav_file.setnchannels(1)  # Mono audio
                 wav_file.setsampwidth(2)  # 16-bit = 2 bytes
                 wav_file.setframerate(22050)  # Sample rate
                 
-                # Write the raw audio data
-                wav_file.writeframes(response.audio)
+                # Stream chunks; wave patches the header sizes on close
+                for response in responses:
+                    wav_file.writeframesraw(response.audio)
         
-        await loop.run_in_executor(None, synthesize_sync)
+        await loop.run_in_executor(_BLOCKING_POOL, synthesize_sync)
         
         logger.info(f"TTS audio saved locally with proper WAV header: {local_file_path}")
         
@@ -318,6 +549,7 @@ def save_user_preference(user_id: str, preference_key: str, preference_value: st
         Success or error message
     """
     try:
+        container = _get_container()
         if not container:
             return "Error: Cosmos DB not initialized"
         
@@ -328,7 +560,7 @@ def save_user_preference(user_id: str, preference_key: str, preference_value: st
             "type": "preference",
             "key": preference_key,
             "value": preference_value,
-            "updated_at": datetime.utcnow().isoformat()
+            "updated_at": _utcnow().isoformat()
         }
         
         # Upsert (update or insert)
@@ -354,16 +586,18 @@ def get_user_preferences(user_id: str) -> str:
         Dictionary of user preferences
     """
     try:
+        container = _get_container()
         if not container:
             return "Error: Cosmos DB not initialized"
         
-        query = f"SELECT * FROM c WHERE c.user_id = @user_id AND c.type = 'preference'"
         parameters = [{"name": "@user_id", "value": user_id}]
         
+        # user_id IS the partition key: scoping the query to it makes this a
+        # single-partition read instead of a cross-partition scatter-gather
         items = list(container.query_items(
-            query=query,
+            query=_PREFERENCES_QUERY,
             parameters=parameters,
-            enable_cross_partition_query=True
+            partition_key=user_id
         ))
         
         if not items:
@@ -394,6 +628,7 @@ def save_agent_state(user_id: str, task_name: str, state_data: str) -> str:
         Success or error message
     """
     try:
+        container = _get_container()
         if not container:
             return "Error: Cosmos DB not initialized"
         
@@ -404,7 +639,7 @@ def save_agent_state(user_id: str, task_name: str, state_data: str) -> str:
             "type": "agent_state",
             "task_name": task_name,
             "state": state_data,
-            "updated_at": datetime.utcnow().isoformat()
+            "updated_at": _utcnow().isoformat()
         }
         
         container.upsert_item(body=state_item)
@@ -430,6 +665,7 @@ def get_agent_state(user_id: str, task_name: str) -> str:
         Task state data or error message
     """
     try:
+        container = _get_container()
         if not container:
             return "Error: Cosmos DB not initialized"
         
@@ -446,6 +682,66 @@ def get_agent_state(user_id: str, task_name: str) -> str:
         return f"Error retrieving task state: {str(e)}"
 
 
+# Buffered note writer: burst writes (e.g. an agent importing many notes)
+# coalesce into one flush instead of a Cosmos round trip per item. A flush
+# happens when the buffer is full or after the max-wait timer fires, so a
+# lone note still lands within ~200ms.
+_NOTE_BATCH_SIZE = 50
+_NOTE_FLUSH_SECONDS = 0.2
+_note_buffer: list = []
+_note_lock = threading.Lock()
+_note_flush_timer = None
+
+
+def _flush_notes():
+    global _note_flush_timer
+    with _note_lock:
+        items = list(_note_buffer)
+        _note_buffer.clear()
+        if _note_flush_timer is not None:
+            _note_flush_timer.cancel()
+            _note_flush_timer = None
+    container = _get_container()
+    if container is None:
+        if items:
+            logger.error(f"Dropping {len(items)} buffered note(s): Cosmos DB unavailable")
+        return
+    # execute_item_batch is transactional within one partition key, so group
+    # by user and send up to 100 creates per round trip; a lone note keeps
+    # the cheaper single create_item call
+    groups: dict = {}
+    for item in items:
+        groups.setdefault(item["user_id"], []).append(item)
+    for user_id, user_items in groups.items():
+        for start in range(0, len(user_items), _COSMOS_BATCH_LIMIT):
+            chunk = user_items[start:start + _COSMOS_BATCH_LIMIT]
+            try:
+                if len(chunk) == 1:
+                    container.create_item(body=chunk[0])
+                else:
+                    container.execute_item_batch(
+                        [("create", (it,)) for it in chunk],
+                        partition_key=user_id,
+                    )
+            except exceptions.CosmosHttpResponseError as e:
+                logger.error(f"Failed to flush {len(chunk)} note(s) for user {user_id}: {e}")
+    if items:
+        logger.info(f"Flushed {len(items)} note(s) to Cosmos DB")
+
+
+def _enqueue_note(item: dict):
+    global _note_flush_timer
+    with _note_lock:
+        _note_buffer.append(item)
+        full = len(_note_buffer) >= _NOTE_BATCH_SIZE
+        if not full and _note_flush_timer is None:
+            _note_flush_timer = threading.Timer(_NOTE_FLUSH_SECONDS, _flush_notes)
+            _note_flush_timer.daemon = True
+            _note_flush_timer.start()
+    if full:
+        _flush_notes()
+
+
 @tool
 def store_note(user_id: str, note_content: str) -> str:
     """
@@ -459,20 +755,22 @@ def store_note(user_id: str, note_content: str) -> str:
         Success or error message
     """
     try:
+        container = _get_container()
         if not container:
             return "Error: Cosmos DB not initialized"
         
-        note_id = str(uuid.uuid4())
+        # .hex skips hyphen formatting; still globally unique and Cosmos-valid
+        note_id = uuid.uuid4().hex
         note_item = {
             "id": note_id,
             "user_id": user_id,
             "type": "note",
             "content": note_content,
-            "created_at": datetime.utcnow().isoformat()
+            "created_at": _utcnow().isoformat()
         }
         
-        container.create_item(body=note_item)
-        logger.info(f"Note stored for user {user_id}")
+        _enqueue_note(note_item)
+        logger.info(f"Note queued for user {user_id}")
         
         return f"✅ Note saved successfully"
     
@@ -494,30 +792,34 @@ def get_notes(user_id: str, limit: int = 10) -> str:
         List of notes
     """
     try:
+        container = _get_container()
         if not container:
             return "Error: Cosmos DB not initialized"
         
-        query = f"SELECT * FROM c WHERE c.user_id = @user_id AND c.type = 'note' ORDER BY c.created_at DESC OFFSET 0 LIMIT @limit"
+        # Make sure buffered notes are visible before querying
+        _flush_notes()
+        
         parameters = [
             {"name": "@user_id", "value": user_id},
             {"name": "@limit", "value": limit}
         ]
         
         items = list(container.query_items(
-            query=query,
+            query=_NOTES_QUERY,
             parameters=parameters,
-            enable_cross_partition_query=True
+            partition_key=user_id
         ))
         
         if not items:
             return f"No notes found for user {user_id}"
         
-        notes_list = []
-        for idx, note in enumerate(items, 1):
-            created = note['created_at'][:10]  # Just the date
-            notes_list.append(f"{idx}. ({created}) {note['content']}")
-        
-        return f"*📝 Your Notes ({len(items)}):*\n\n" + "\n\n".join(notes_list)
+        # created_at[:10] keeps just the date; join consumes the generator
+        # without materializing an intermediate list
+        notes = "\n\n".join(
+            f"{idx}. ({note['created_at'][:10]}) {note['content']}"
+            for idx, note in enumerate(items, 1)
+        )
+        return f"*📝 Your Notes ({len(items)}):*\n\n" + notes
     
     except exceptions.CosmosHttpResponseError as e:
         logger.error(f"Failed to retrieve notes: {e}")
@@ -539,27 +841,48 @@ async def web_search(query: str) -> str:
     try:
         if not tavily_search:
             return "Error: Tavily Search not initialized. Please check TAVILY_API_KEY."
-        
+
+        # Serve repeated queries from the TTL-LRU (agents often re-ask the
+        # same thing across reasoning steps)
+        cache_key = query.strip().lower()
+        cached = _search_cache.get(cache_key)
+        if cached is not None:
+            response, cached_at = cached
+            if time.monotonic() - cached_at < SEARCH_CACHE_TTL_SECONDS:
+                _search_cache.move_to_end(cache_key)
+                logger.info(f"Web search cache hit: {query}")
+                return response
+            del _search_cache[cache_key]
+
+        # Reuse a speculative result if one was prefetched for this exact query
+        speculative = await tool_prefetch.take_result(query)
+        if speculative is not None:
+            _search_cache[cache_key] = (speculative, time.monotonic())
+            return speculative
+
         logger.info(f"Performing web search: {query}")
         
         # Run search in executor to avoid blocking
-        loop = asyncio.get_event_loop()
-        results = await loop.run_in_executor(None, lambda: tavily_search.invoke({"query": query}))
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(_BLOCKING_POOL, tavily_search.invoke, {"query": query})
         
         if not results:
             return "No results found for your search query."
         
-        # Format results for better readability
-        formatted_results = []
-        for i, result in enumerate(results, 1):
-            title = result.get("title", "No title")
-            content = result.get("content", "No content")
-            url = result.get("url", "")
-            formatted_results.append(f"{i}. {title}\n{content}\nSource: {url}\n")
-        
-        response = "\n".join(formatted_results)
+        # Format results for better readability - join consumes the
+        # generator directly, no intermediate list of formatted strings
+        response = "\n".join(
+            f"{i}. {r.get('title', 'No title')}\n"
+            f"{r.get('content', 'No content')}\n"
+            f"Source: {r.get('url', '')}\n"
+            for i, r in enumerate(results, 1)
+        )
         logger.info(f"Web search completed. Found {len(results)} results.")
         
+        _search_cache[cache_key] = (response, time.monotonic())
+        if len(_search_cache) > SEARCH_CACHE_MAX_ENTRIES:
+            _search_cache.popitem(last=False)
+        
         return response
     
     except Exception as e:
@@ -567,6 +890,20 @@ async def web_search(query: str) -> str:
         return f"Error performing web search: {str(e)}"
 
 
+def _format_email_line(line: str) -> str:
+    """Wrap one plain-text line in its HTML element (heading/para/break)."""
+    stripped = line.strip()
+    if not stripped:
+        return '<br>'
+    # Heading heuristic: ends with : or is short and capitalized
+    if (
+        stripped.endswith(':') or
+        (len(stripped.split()) <= 8 and stripped[0].isupper() and not stripped.endswith('.'))
+    ):
+        return f'<h3 style="margin-top: 20px; margin-bottom: 10px; color: #333;">{stripped}</h3>'
+    return f'<p style="margin-bottom: 12px; line-height: 1.6;">{stripped}</p>'
+
+
 @tool
 async def send_email(to: str, subject: str, body: str) -> str:
     """
@@ -581,34 +918,14 @@ async def send_email(to: str, subject: str, body: str) -> str:
         Success or error message
     """
     try:
+        gmail_service = await get_gmail_service()
         if not gmail_service:
             return "Error: Gmail service not initialized. Please check credentials.json"
         
         logger.info(f"Sending email to: {to}")
         
-        from email.mime.multipart import MIMEMultipart
-        from email.mime.text import MIMEText
-        import base64
-        
-        # Convert plain text to HTML with proper formatting
-        # Replace \n\n with paragraph breaks and \n with line breaks
-        html_body = body.replace('\n\n', '</p><p>').replace('\n', '<br>')
-        
-        # Detect headings (lines that end with : or are in title case)
-        lines = body.split('\n')
-        formatted_lines = []
-        for line in lines:
-            stripped = line.strip()
-            # Check if line looks like a heading (ends with : or is short and capitalized)
-            if stripped and (
-                stripped.endswith(':') or 
-                (len(stripped.split()) <= 8 and stripped[0].isupper() and not stripped.endswith('.'))
-            ):
-                formatted_lines.append(f'<h3 style="margin-top: 20px; margin-bottom: 10px; color: #333;">{stripped}</h3>')
-            elif stripped:
-                formatted_lines.append(f'<p style="margin-bottom: 12px; line-height: 1.6;">{stripped}</p>')
-            else:
-                formatted_lines.append('<br>')
+        # Convert plain text to HTML: one pass over the body, joined once
+        html_lines = ''.join(_format_email_line(line) for line in body.split('\n'))
         
         html_content = f"""
         <html>
@@ -631,7 +948,7 @@ async def send_email(to: str, subject: str, body: str) -> str:
                 </style>
             </head>
             <body>
-                {''.join(formatted_lines)}
+                {html_lines}
             </body>
         </html>
         """
@@ -651,14 +968,14 @@ async def send_email(to: str, subject: str, body: str) -> str:
         
         raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
         
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None,
-            lambda: gmail_service.users().messages().send(
-                userId='me',
-                body={'raw': raw_message}
-            ).execute()
+        # Building the HttpRequest is pure local work; only execute() blocks.
+        # Passing the bound method avoids allocating a closure per call.
+        send_request = gmail_service.users().messages().send(
+            userId='me',
+            body={'raw': raw_message}
         )
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(_BLOCKING_POOL, send_request.execute)
         
         logger.info(f"Email sent successfully. Message ID: {result['id']}")
         return "Email sent successfully."
@@ -681,48 +998,97 @@ async def search_emails(query: str, max_results: int = 5) -> str:
         List of matching emails with subjects and snippets
     """
     try:
+        gmail_service = await get_gmail_service()
         if not gmail_service:
             return "Error: Gmail service not initialized. Please check credentials.json"
         
         logger.info(f"Searching emails with query: {query}")
         
-        loop = asyncio.get_event_loop()
-        results = await loop.run_in_executor(
-            None,
-            lambda: gmail_service.users().messages().list(
-                userId='me',
-                q=query,
-                maxResults=max_results
-            ).execute()
+        cache_key = (query, max_results)
+        cached = _email_search_cache.get(cache_key)
+        if cached is not None:
+            result, stored_at = cached
+            if time.monotonic() - stored_at < GOOGLE_READ_CACHE_TTL_SECONDS:
+                _email_search_cache.move_to_end(cache_key)
+                logger.info(f"Email search cache hit for: {query}")
+                return result
+            del _email_search_cache[cache_key]
+        
+        list_request = gmail_service.users().messages().list(
+            userId='me',
+            q=query,
+            maxResults=max_results
         )
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(_BLOCKING_POOL, list_request.execute)
         
         messages = results.get('messages', [])
         
         if not messages:
             return f"No emails found matching: {query}"
         
+        # Fetch all metadata blobs in ONE multipart batch request instead
+        # of a round trip per message
         email_list = []
-        for msg in messages:
-            msg_data = await loop.run_in_executor(
-                None,
-                lambda m=msg: gmail_service.users().messages().get(
-                    userId='me',
-                    id=m['id'],
-                    format='metadata',
-                    metadataHeaders=['From', 'Subject', 'Date']
-                ).execute()
-            )
-            
-            headers = {h['name']: h['value'] for h in msg_data['payload']['headers']}
+
+        def collect(request_id, msg_data, exception):
+            if exception is not None:
+                logger.warning(f"Batch get failed for message {request_id}: {exception}")
+                return
+            # Single pass over the (already metadata-trimmed) header list,
+            # stopping once the three wanted values are found
+            from_h = subject_h = date_h = None
+            for h in msg_data['payload']['headers']:
+                name = h['name']
+                if name == 'From':
+                    from_h = h['value']
+                elif name == 'Subject':
+                    subject_h = h['value']
+                elif name == 'Date':
+                    date_h = h['value']
+                if from_h and subject_h and date_h:
+                    break
             email_list.append(
-                f"From: {headers.get('From', 'Unknown')}\n"
-                f"Subject: {headers.get('Subject', 'No subject')}\n"
-                f"Date: {headers.get('Date', 'Unknown')}\n"
+                f"From: {from_h or 'Unknown'}\n"
+                f"Subject: {subject_h or 'No subject'}\n"
+                f"Date: {date_h or 'Unknown'}\n"
                 f"Snippet: {msg_data.get('snippet', '')}\n"
             )
+
+        # One multipart batch covers up to the Gmail batch limit; larger
+        # result sets are split into several batches executed concurrently
+        # (bounded so we don't burst past API quotas)
+        batches = []
+        for start in range(0, len(messages), _GMAIL_BATCH_LIMIT):
+            batch = gmail_service.new_batch_http_request()
+            for msg in messages[start:start + _GMAIL_BATCH_LIMIT]:
+                batch.add(
+                    gmail_service.users().messages().get(
+                        userId='me',
+                        id=msg['id'],
+                        format='metadata',
+                        metadataHeaders=['From', 'Subject', 'Date']
+                    ),
+                    callback=collect
+                )
+            batches.append(batch)
+
+        semaphore = asyncio.Semaphore(4)
+
+        async def run_batch(b):
+            async with semaphore:
+                await loop.run_in_executor(_BLOCKING_POOL, b.execute)
+
+        await asyncio.gather(*[run_batch(b) for b in batches])
         
         logger.info(f"Found {len(email_list)} matching emails")
-        return "\n---\n".join(email_list)
+        response = "\n---\n".join(email_list)
+        
+        _email_search_cache[cache_key] = (response, time.monotonic())
+        if len(_email_search_cache) > GOOGLE_READ_CACHE_MAX_ENTRIES:
+            _email_search_cache.popitem(last=False)
+        
+        return response
     
     except Exception as e:
         logger.error(f"Failed to search emails: {e}")
@@ -745,6 +1111,7 @@ async def create_calendar_event(summary: str, start_time: str, end_time: str, de
         Success message with event link or error message
     """
     try:
+        calendar_service = await get_calendar_service()
         if not calendar_service:
             return "Error: Calendar service not initialized. Please check credentials.json"
         
@@ -764,18 +1131,19 @@ async def create_calendar_event(summary: str, start_time: str, end_time: str, de
             },
         }
         
-        loop = asyncio.get_event_loop()
-        created_event = await loop.run_in_executor(
-            None,
-            lambda: calendar_service.events().insert(
-                calendarId='primary',
-                body=event
-            ).execute()
+        insert_request = calendar_service.events().insert(
+            calendarId='primary',
+            body=event
         )
+        loop = asyncio.get_running_loop()
+        created_event = await loop.run_in_executor(_BLOCKING_POOL, insert_request.execute)
         
         event_link = created_event.get('htmlLink')
         logger.info(f"Calendar event created: {event_link}")
         
+        # The new event must show up in the next listing
+        _calendar_list_cache.clear()
+        
         return f"Event '{summary}' created successfully!\nLink: {event_link}"
     
     except Exception as e:
@@ -795,25 +1163,32 @@ async def list_calendar_events(max_results: int = 10) -> str:
         List of upcoming calendar events
     """
     try:
+        calendar_service = await get_calendar_service()
         if not calendar_service:
             return "Error: Calendar service not initialized. Please check credentials.json"
         
         logger.info(f"Listing upcoming calendar events")
         
-        from datetime import datetime as dt
-        now = dt.utcnow().isoformat() + 'Z'
-        
-        loop = asyncio.get_event_loop()
-        events_result = await loop.run_in_executor(
-            None,
-            lambda: calendar_service.events().list(
-                calendarId='primary',
-                timeMin=now,
-                maxResults=max_results,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
+        cached = _calendar_list_cache.get(max_results)
+        if cached is not None:
+            result, stored_at = cached
+            if time.monotonic() - stored_at < GOOGLE_READ_CACHE_TTL_SECONDS:
+                _calendar_list_cache.move_to_end(max_results)
+                logger.info("Calendar list cache hit")
+                return result
+            del _calendar_list_cache[max_results]
+        
+        now = _utcnow().isoformat() + 'Z'
+        
+        list_request = calendar_service.events().list(
+            calendarId='primary',
+            timeMin=now,
+            maxResults=max_results,
+            singleEvents=True,
+            orderBy='startTime'
         )
+        loop = asyncio.get_running_loop()
+        events_result = await loop.run_in_executor(_BLOCKING_POOL, list_request.execute)
         
         events = events_result.get('items', [])
         
@@ -832,13 +1207,50 @@ async def list_calendar_events(max_results: int = 10) -> str:
             )
         
         logger.info(f"Found {len(event_list)} upcoming events")
-        return "\n---\n".join(event_list)
+        response = "\n---\n".join(event_list)
+        
+        _calendar_list_cache[max_results] = (response, time.monotonic())
+        if len(_calendar_list_cache) > GOOGLE_READ_CACHE_MAX_ENTRIES:
+            _calendar_list_cache.popitem(last=False)
+        
+        return response
     
     except Exception as e:
         logger.error(f"Failed to list calendar events: {e}")
         return f"Error listing calendar events: {str(e)}"
 
 
+# Same precedence order as the original elif chain, used only for element
+# classes not already in _ELEMENT_CATEGORY_MAP
+_CATEGORY_BY_SUBSTRING = (
+    ('Title', 'titles'),
+    ('Header', 'headings'),
+    ('Heading', 'headings'),
+    ('NarrativeText', 'text'),
+    ('Text', 'text'),
+    ('ListItem', 'lists'),
+    ('Table', 'tables'),
+)
+
+
+def _element_category(element_cls) -> str:
+    """Map an Unstructured element class to its output category.
+
+    One dict hash per element; unknown classes pay the substring scan once
+    and are memoized for the rest of the process.
+    """
+    cat = _ELEMENT_CATEGORY_MAP.get(element_cls)
+    if cat is None:
+        name = element_cls.__name__
+        cat = 'other'
+        for key, candidate in _CATEGORY_BY_SUBSTRING:
+            if key in name:
+                cat = candidate
+                break
+        _ELEMENT_CATEGORY_MAP[element_cls] = cat
+    return cat
+
+
 @tool
 async def read_document(file_path: str) -> str:
     """
@@ -870,101 +1282,150 @@ async def read_document(file_path: str) -> str:
         
         if not file_path_obj.is_file():
             return f"Error: Path is not a file: {file_path}"
-        
+
+        # Cheap pre-checks before Unstructured's content sniffing (which
+        # opens the file, reads magic bytes and may spawn Tesseract)
+        file_size_bytes = file_path_obj.stat().st_size
+        if file_size_bytes == 0:
+            return f"Error: File is empty: {file_path}"
+        if file_size_bytes > DOC_MAX_FILE_BYTES:
+            return (
+                f"Error: File too large ({file_size_bytes / (1024 * 1024):.1f} MB; "
+                f"limit is {DOC_MAX_FILE_BYTES // (1024 * 1024)} MB)"
+            )
+        ext = file_path_obj.suffix.lower().lstrip('.')
+        if ext and ext not in DOC_SUPPORTED_EXTENSIONS:
+            return (
+                f"Error: Unsupported file type: .{ext}. "
+                f"Supported: {', '.join(sorted(DOC_SUPPORTED_EXTENSIONS))}"
+            )
+
+        # OCR/parsing takes seconds per document, so cache the extracted text
+        # by content hash - repeat questions about the same file hit Redis
+        # instead of re-parsing (blake2b is fast enough to hash 20MB inline)
+        file_bytes = file_path_obj.read_bytes()
+        doc_hash = hashlib.blake2b(file_bytes, digest_size=16).hexdigest()
+        cache_key = f"doc:{doc_hash}:{len(file_bytes)}"
+
+        cached = _doc_cache.get(cache_key)
+        if cached is not None:
+            _doc_cache.move_to_end(cache_key)
+            logger.info(f"Document cache hit (local) for {file_path_obj.name}")
+            return cached
+
+        if redis_store.is_available():
+            try:
+                cached = await redis_store.redis_client.get(cache_key)
+                if cached:
+                    logger.info(f"Document cache hit for {file_path_obj.name}")
+                    _doc_cache[cache_key] = cached
+                    return cached
+            except Exception as e:
+                logger.warning(f"Document cache lookup failed: {e}")
+
         logger.info(f"Processing document: {file_path}")
-        
+
         # Use Unstructured to partition the document
-        # This automatically detects file type and extracts content
-        elements = partition(filename=str(file_path))
+        # This automatically detects file type and extracts content.
+        # partition() is seconds of CPU/OCR work - run it on the blocking
+        # pool so other tool calls keep making progress
+        loop = asyncio.get_running_loop()
+        elements = await loop.run_in_executor(
+            _BLOCKING_POOL, partial(partition, filename=str(file_path))
+        )
         
         if not elements:
             return f"Error: No content could be extracted from {file_path}"
         
-        # Organize content by element type
-        structured_content = {
-            'titles': [],
-            'headings': [],
-            'text': [],
-            'lists': [],
-            'tables': [],
-            'other': []
+        # Organize content in ONE pass: each element's text goes straight
+        # into its category buffer, so no per-category list of small strings
+        # grows and no second formatting pass re-walks the elements
+        titles_buf = io.StringIO()
+        headings_buf = io.StringIO()
+        text_buf = io.StringIO()
+        lists_buf = io.StringIO()
+        tables_buf = io.StringIO()
+        other_buf = io.StringIO()
+        
+        category_sinks = {
+            'titles': (titles_buf, '  • ', '\n'),
+            'headings': (headings_buf, '  • ', '\n'),
+            'text': (text_buf, '', '\n'),
+            'lists': (lists_buf, '  • ', '\n'),
+            'tables': (tables_buf, '', '\n---\n'),
+            'other': (other_buf, '', '\n'),
         }
         
+        # Hot loop: bind lookups to locals (LOAD_FAST beats global/attr
+        # resolution) and hit the category map directly so known element
+        # classes skip a Python function call per element
+        category_map_get = _ELEMENT_CATEGORY_MAP.get
+        resolve_category = _element_category
+        sinks = category_sinks
         for element in elements:
-            element_type = str(type(element).__name__)
-            element_text = str(element).strip()
+            # .text is the raw string Unstructured stores on the element;
+            # reading it skips the __str__ formatting pass str() would do
+            text = getattr(element, 'text', None)
+            element_text = text.strip() if text else ''
             
             if not element_text:
                 continue
             
-            # Categorize elements
-            if 'Title' in element_type:
-                structured_content['titles'].append(element_text)
-            elif 'Header' in element_type or 'Heading' in element_type:
-                structured_content['headings'].append(element_text)
-            elif 'NarrativeText' in element_type or 'Text' in element_type:
-                structured_content['text'].append(element_text)
-            elif 'ListItem' in element_type:
-                structured_content['lists'].append(element_text)
-            elif 'Table' in element_type:
-                structured_content['tables'].append(element_text)
-            else:
-                structured_content['other'].append(element_text)
+            cls = type(element)
+            cat = category_map_get(cls)
+            if cat is None:
+                cat = resolve_category(cls)
+            buf, prefix, suffix = sinks[cat]
+            buf.write(prefix)
+            buf.write(element_text)
+            buf.write(suffix)
         
         # Format the output nicely
-        output_parts = []
-        
-        # Add file info
-        file_size = file_path_obj.stat().st_size / 1024  # KB
-        output_parts.append(f"📄 Document: {file_path_obj.name}")
-        output_parts.append(f"📊 Size: {file_size:.2f} KB")
-        output_parts.append(f"📝 Elements found: {len(elements)}")
-        output_parts.append("\n" + "="*60 + "\n")
-        
-        # Add titles
-        if structured_content['titles']:
-            output_parts.append("📌 TITLES:")
-            for title in structured_content['titles']:
-                output_parts.append(f"  • {title}")
-            output_parts.append("")
-        
-        # Add headings
-        if structured_content['headings']:
-            output_parts.append("📑 HEADINGS:")
-            for heading in structured_content['headings']:
-                output_parts.append(f"  • {heading}")
-            output_parts.append("")
-        
-        # Add main text content
-        if structured_content['text']:
-            output_parts.append("📖 CONTENT:")
-            output_parts.append("\n".join(structured_content['text']))
-            output_parts.append("")
-        
-        # Add lists
-        if structured_content['lists']:
-            output_parts.append("📋 LISTS:")
-            for item in structured_content['lists']:
-                output_parts.append(f"  • {item}")
-            output_parts.append("")
-        
-        # Add tables
-        if structured_content['tables']:
-            output_parts.append("📊 TABLES:")
-            for table in structured_content['tables']:
-                output_parts.append(table)
-                output_parts.append("---")
-            output_parts.append("")
-        
-        # Add other content
-        if structured_content['other']:
-            output_parts.append("📎 OTHER ELEMENTS:")
-            output_parts.append("\n".join(structured_content['other']))
+        file_size = file_size_bytes / 1024  # KB
+        output_parts = [
+            f"📄 Document: {file_path_obj.name}",
+            f"📊 Size: {file_size:.2f} KB",
+            f"📝 Elements found: {len(elements)}",
+            "\n" + "="*60 + "\n",
+        ]
         
-        result = "\n".join(output_parts)
+        for header, buf in (
+            ("📌 TITLES:", titles_buf),
+            ("📑 HEADINGS:", headings_buf),
+            ("📖 CONTENT:", text_buf),
+            ("📋 LISTS:", lists_buf),
+            ("📊 TABLES:", tables_buf),
+            ("📎 OTHER ELEMENTS:", other_buf),
+        ):
+            section = buf.getvalue()
+            if section:
+                output_parts.append(header)
+                output_parts.append(section)
         
+        result = "\n".join(output_parts)
+
         logger.info(f"Successfully extracted {len(elements)} elements from {file_path_obj.name}")
-        
+
+        # A tool result is consumed whole by the agent's context window, so
+        # a 500-page OCR dump helps nobody - truncate with a notice instead
+        # of returning tens of MB (this also keeps every entry cacheable)
+        if len(result) > DOC_CACHE_MAX_RESULT_CHARS:
+            result = (
+                result[:DOC_CACHE_MAX_RESULT_CHARS]
+                + f"\n\n[... output truncated at {DOC_CACHE_MAX_RESULT_CHARS} characters; "
+                f"ask about a specific section for more detail ...]"
+            )
+
+        _doc_cache[cache_key] = result
+        if len(_doc_cache) > DOC_CACHE_MAX_ENTRIES:
+            _doc_cache.popitem(last=False)
+
+        if redis_store.is_available():
+            try:
+                await redis_store.redis_client.setex(cache_key, DOC_CACHE_TTL_SECONDS, result)
+            except Exception as e:
+                logger.warning(f"Document cache store failed: {e}")
+
         return result
     
     except Exception as e:
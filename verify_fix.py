@@ -3,12 +3,20 @@ Post-Fix Verification Script
 Run this AFTER completing all fix steps to verify everything works
 """
 
+import json
+import mmap
 import os
-import pickle
-import asyncio
-from colorama import init, Fore, Style
 
-init(autoreset=True)
+# colorama and the Google import chain are deferred so failure paths
+# (missing token, missing credentials) answer in milliseconds
+try:
+    from colorama import init, Fore
+    init(autoreset=True)
+except ImportError:
+    class _NoColor:
+        def __getattr__(self, name):
+            return ''
+    Fore = _NoColor()
 
 def print_header(text):
     print(f"\n{Fore.CYAN}{'=' * 70}")
@@ -33,52 +41,72 @@ async def verify_fix():
     issues = []
     successes = []
     
+    # One directory scan covers every existence check below - a single
+    # syscall pass instead of a stat() per file
+    present = {entry.name for entry in os.scandir('.')}
+    
     # Check 1: Old token deleted
     print_info("Checking for old token files...")
-    if os.path.exists('token.pickle'):
+    if 'token.pickle' in present:
         print_error("Old token.pickle still exists! Delete it.")
         issues.append("Delete token.pickle")
     else:
         print_success("Old token.pickle deleted")
         successes.append("Old token deleted")
     
-    # Check 2: New token exists
+    # Check 2: New token exists. EAFP: open directly instead of consulting
+    # the directory listing first - no stat/open race, and the open itself
+    # answers the existence question
     print_info("Checking for new token...")
-    if not os.path.exists('token_full_access.pickle'):
-        print_error("token_full_access.pickle not found! You need to re-authenticate.")
-        issues.append("Re-authenticate to create token_full_access.pickle")
-    else:
-        print_success("token_full_access.pickle found")
-        
-        # Check token validity
+    token_found = False
+    try:
+        # The token is stored as JSON now, so the scopes read directly
+        # without unpickling (or importing) Google's credential classes;
+        # legacy pickle tokens still get the old path
+        token_ok = False
+        granted_scopes = []
         try:
+            with open('token_full_access.pickle', 'r', encoding='utf-8') as token:
+                info = json.load(token)
+            granted_scopes = info.get('scopes') or []
+            token_ok = bool(info.get('refresh_token') or info.get('token'))
+        except (ValueError, UnicodeDecodeError):
+            import pickle
             with open('token_full_access.pickle', 'rb') as token:
                 creds = pickle.load(token)
+            granted_scopes = creds.scopes if hasattr(creds, 'scopes') and creds.scopes else []
+            token_ok = bool(creds and creds.valid)
+        
+        token_found = True
+        print_success("token_full_access.pickle found")
+        
+        if token_ok:
+            print_success("Token is valid")
+            successes.append("Valid authentication token")
+            
+            # Check scopes
+            print_info(f"Granted scopes: {len(granted_scopes)}")
             
-            if creds and creds.valid:
-                print_success("Token is valid")
-                successes.append("Valid authentication token")
-                
-                # Check scopes
-                granted_scopes = creds.scopes if hasattr(creds, 'scopes') and creds.scopes else []
-                print_info(f"Granted scopes: {len(granted_scopes)}")
-                
-                if len(granted_scopes) >= 14:  # Should have 15, but 14+ is okay
-                    print_success(f"Sufficient scopes granted ({len(granted_scopes)})")
-                    successes.append(f"All {len(granted_scopes)} scopes granted")
-                else:
-                    print_error(f"Only {len(granted_scopes)} scopes granted (need 15)")
-                    issues.append("Re-authenticate with all 15 scopes")
+            if len(granted_scopes) >= 14:  # Should have 15, but 14+ is okay
+                print_success(f"Sufficient scopes granted ({len(granted_scopes)})")
+                successes.append(f"All {len(granted_scopes)} scopes granted")
             else:
-                print_error("Token is invalid or expired")
-                issues.append("Refresh or re-create token")
-        except Exception as e:
-            print_error(f"Token error: {str(e)}")
-            issues.append("Fix token file")
+                print_error(f"Only {len(granted_scopes)} scopes granted (need 15)")
+                issues.append("Re-authenticate with all 15 scopes")
+        else:
+            print_error("Token is invalid or expired")
+            issues.append("Refresh or re-create token")
+    except FileNotFoundError:
+        print_error("token_full_access.pickle not found! You need to re-authenticate.")
+        issues.append("Re-authenticate to create token_full_access.pickle")
+    except Exception as e:
+        token_found = True
+        print_error(f"Token error: {str(e)}")
+        issues.append("Fix token file")
     
     # Check 3: credentials.json exists
     print_info("Checking credentials.json...")
-    if not os.path.exists('credentials.json'):
+    if 'credentials.json' not in present:
         print_error("credentials.json not found!")
         issues.append("Download credentials.json from Google Cloud Console")
     else:
@@ -88,38 +116,44 @@ async def verify_fix():
     # Check 4: Google tools file has logging
     print_info("Checking google_tools.py for logging...")
     try:
-        with open('google_tools.py', 'r', encoding='utf-8') as f:
-            content = f.read()
+        # mmap keeps the scan in C (memmem) without decoding the whole
+        # file to str first
+        with open('google_tools.py', 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                has_marker = mm.find('🔵 CALLING'.encode('utf-8')) != -1
+                has_logging = mm.find(b'logger.info') != -1 and mm.find(b'logger.error') != -1
         
-        if '🔵 CALLING' in content:
+        if has_marker:
             print_success("Logging markers found in google_tools.py")
             successes.append("Enhanced logging enabled")
         else:
             print_warning("Logging markers not found (might be okay)")
         
-        if 'logger.info' in content and 'logger.error' in content:
+        if has_logging:
             print_success("Logger statements present")
         else:
             print_warning("Logger statements might be missing")
     except Exception as e:
         print_error(f"Error reading google_tools.py: {str(e)}")
     
-    # Check 5: Test tools import
-    print_info("Testing Google tools import...")
-    try:
-        from google_tools import (
-            search_google_contacts,
-            create_google_doc,
-            create_google_sheet
-        )
-        print_success("Google tools import successfully")
-        successes.append("Tools available to agent")
-    except Exception as e:
-        print_error(f"Import error: {str(e)}")
-        issues.append("Fix google_tools.py import issues")
-    
-    # Check 6: Test tool execution (if token exists)
-    if os.path.exists('token_full_access.pickle'):
+    # Checks 5 and 6 pay the full Google client import chain, so only run
+    # them when a token exists - without one they can't succeed anyway
+    if token_found:
+        # Check 5: Test tools import
+        print_info("Testing Google tools import...")
+        try:
+            from google_tools import (
+                search_google_contacts,
+                create_google_doc,
+                create_google_sheet
+            )
+            print_success("Google tools import successfully")
+            successes.append("Tools available to agent")
+        except Exception as e:
+            print_error(f"Import error: {str(e)}")
+            issues.append("Fix google_tools.py import issues")
+        
+        # Check 6: Test tool execution
         print_info("Testing tool execution...")
         try:
             from google_tools import get_all_google_contacts
@@ -177,6 +211,7 @@ async def verify_fix():
         return True
 
 if __name__ == "__main__":
+    import asyncio
     try:
         result = asyncio.run(verify_fix())
         
@@ -3,10 +3,21 @@ NVIDIA VLM (Vision Language Model) Tools
 Provides image and video analysis capabilities using nvidia/nemotron-nano-12b-v2-vl
 """
 
+import asyncio
+import time
+import orjson
 import requests
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 import os
-import base64
 import logging
+import mmap
+# pybase64 encodes 3-8x faster via SIMD; stdlib base64 is the fallback
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from langchain.tools import tool
 from typing import List, Optional
 
@@ -16,6 +27,22 @@ logger = logging.getLogger(__name__)
 NVIDIA_API_URL = "https://integrate.api.nvidia.com/v1/chat/completions"
 NVIDIA_API_KEY = os.getenv("NVIDIA_API_KEY")  # Set this in your environment
 
+# One pooled session for all VLM calls: keepalive connections to
+# integrate.api.nvidia.com skip the 2-3 RTT TLS handshake per request
+# (requests can't speak HTTP/2, but connection reuse is the bulk of the win)
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8),
+)
+
+# Identical on every call - build once; None doubles as the key-missing flag
+_NVIDIA_HEADERS = {
+    "Authorization": f"Bearer {NVIDIA_API_KEY}",
+    "Content-Type": "application/json",
+    "Accept": "application/json",
+} if NVIDIA_API_KEY else None
+
 # Supported media formats
 SUPPORTED_FORMATS = {
     "png": ["image/png", "image_url"],
@@ -47,13 +74,60 @@ def get_media_type(ext: str) -> str:
 def encode_media_to_base64(file_path: str) -> str:
     """Encode media file to base64 string"""
     try:
+        # mmap the file so b64encode reads the page cache directly instead of
+        # copying the whole file into a Python bytes object first
         with open(file_path, "rb") as f:
-            return base64.b64encode(f.read()).decode("utf-8")
+            if os.path.getsize(file_path) == 0:
+                return ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return base64.b64encode(mm).decode("ascii")
     except Exception as e:
         logger.error(f"Failed to encode media file: {e}")
         raise
 
 
+def _data_url(file_path: str) -> str:
+    """Stat + encode one file (cache-aware); safe to run on worker threads."""
+    st = os.stat(file_path)
+    return _encoded_url(file_path, st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=32)
+def _encoded_url(file_path: str, mtime_ns: int, size: int) -> str:
+    """Memoized data URL for a media file.
+
+    mtime_ns and size are part of the key purely to invalidate the cache
+    when the file changes on disk; agents commonly re-analyze the same
+    image with several queries, and this skips the re-encode each time.
+    """
+    ext = get_file_extension(file_path)
+    return f"data:{get_mime_type(ext)};base64,{encode_media_to_base64(file_path)}"
+
+
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(min=1, max=8),
+    retry=retry_if_exception_type((requests.Timeout, requests.ConnectionError)),
+    reraise=True,
+)
+def _post_vlm_request(body: bytes, headers: dict) -> requests.Response:
+    """POST the prebuilt payload, retrying transient network failures.
+
+    The body stays in memory across attempts, so a retry never repeats
+    the base64 encode - the dominant cost for large media.
+    """
+    response = _SESSION.post(NVIDIA_API_URL, headers=headers, data=body, timeout=60)
+    if response.status_code in (429, 500, 502, 503, 504):
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                time.sleep(min(float(retry_after), 8.0))
+            except ValueError:
+                pass
+        raise requests.ConnectionError(f"Transient VLM error: HTTP {response.status_code}")
+    return response
+
+
 def analyze_media_with_nvidia(
     media_files: List[str],
     query: str,
@@ -70,45 +144,55 @@ def analyze_media_with_nvidia(
     Returns:
         Analysis result from NVIDIA VLM
     """
-    if not NVIDIA_API_KEY:
+    if _NVIDIA_HEADERS is None:
         return "❌ NVIDIA_API_KEY not set. Please add it to your environment variables."
     
     try:
         has_video = False
         
-        # Build content array
-        content = [{"type": "text", "text": query}]
-        
+        # Validate every file up front so the encode stage below only sees
+        # known-good paths
+        media_type_keys = []
         for media_file in media_files:
             if not os.path.exists(media_file):
                 return f"❌ File not found: {media_file}"
             
             ext = get_file_extension(media_file)
             
-            if ext not in SUPPORTED_FORMATS:
-                return f"❌ Unsupported format: {ext}. Supported: {', '.join(SUPPORTED_FORMATS.keys())}"
-            
-            media_type_key = get_media_type(ext)
+            # One dict lookup gets both fields; KeyError doubles as the
+            # unsupported-format check
+            try:
+                _mime, media_type_key = SUPPORTED_FORMATS[ext]
+            except KeyError:
+                return f"❌ Unsupported format: {ext}. Supported: {', '.join(SUPPORTED_FORMATS)}"
             
             if media_type_key == "video_url":
                 has_video = True
             
-            logger.info(f"Encoding {media_file} as base64...")
-            base64_data = encode_media_to_base64(media_file)
-            
-            # Add media to content array
-            media_obj = {
-                "type": media_type_key,
-                media_type_key: {
-                    "url": f"data:{get_mime_type(ext)};base64,{base64_data}"
-                }
-            }
-            content.append(media_obj)
+            media_type_keys.append(media_type_key)
         
         # Validate video constraints
         if has_video and len(media_files) > 1:
             return "❌ Only single video analysis is supported. Cannot mix video with other media."
         
+        logger.info(f"Encoding {len(media_files)} file(s) as base64...")
+        
+        # File reads are GIL-free and b64encode releases the GIL on large
+        # buffers, so multi-image calls encode in parallel - wall clock is
+        # bound by the slowest file instead of the sum
+        if len(media_files) > 1:
+            with ThreadPoolExecutor(max_workers=min(8, len(media_files))) as ex:
+                urls = list(ex.map(_data_url, media_files))
+        else:
+            urls = [_data_url(media_files[0])]
+        
+        # Build content array
+        content = [{"type": "text", "text": query}]
+        content.extend(
+            {"type": mkey, mkey: {"url": url}}
+            for mkey, url in zip(media_type_keys, urls)
+        )
+        
         # Set system prompt based on reasoning preference and media type
         # For agent integration, we turn off reasoning to avoid confusion
         if has_video:
@@ -118,13 +202,6 @@ def analyze_media_with_nvidia(
             # Images support both, use based on preference
             system_prompt = "/think" if use_reasoning else "/no_think"
         
-        # Build request
-        headers = {
-            "Authorization": f"Bearer {NVIDIA_API_KEY}",
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        }
-        
         messages = [
             {
                 "role": "system",
@@ -148,10 +225,12 @@ def analyze_media_with_nvidia(
         }
         
         logger.info(f"Sending request to NVIDIA VLM API...")
-        response = requests.post(NVIDIA_API_URL, headers=headers, json=payload, timeout=60)
+        # orjson serializes the multi-MB base64 payload straight to bytes,
+        # skipping stdlib json's str build plus requests' utf-8 re-encode
+        response = _post_vlm_request(orjson.dumps(payload), _NVIDIA_HEADERS)
         response.raise_for_status()
         
-        result = response.json()
+        result = orjson.loads(response.content)
         
         # Extract the response text
         if "choices" in result and len(result["choices"]) > 0:
@@ -193,7 +272,9 @@ async def analyze_image(image_path: str, query: str = "Describe this image in de
     logger.info(f"Query: {query}")
     
     # Turn off reasoning to avoid confusing main agent LLM
-    result = analyze_media_with_nvidia([image_path], query, use_reasoning=False)
+    result = await asyncio.to_thread(
+        analyze_media_with_nvidia, [image_path], query, use_reasoning=False
+    )
     
     logger.info(f"✅ Image analysis completed")
     return result
@@ -222,7 +303,9 @@ async def analyze_video(video_path: str, query: str = "Describe what happens in
     logger.info(f"Query: {query}")
     
     # Videos only support /no_think mode
-    result = analyze_media_with_nvidia([video_path], query, use_reasoning=False)
+    result = await asyncio.to_thread(
+        analyze_media_with_nvidia, [video_path], query, use_reasoning=False
+    )
     
     logger.info(f"✅ Video analysis completed")
     return result
@@ -257,7 +340,9 @@ async def analyze_multiple_images(
     logger.info(f"Query: {query}")
     
     # Turn off reasoning to avoid confusing main agent LLM
-    result = analyze_media_with_nvidia(paths, query, use_reasoning=False)
+    result = await asyncio.to_thread(
+        analyze_media_with_nvidia, paths, query, use_reasoning=False
+    )
     
     logger.info(f"✅ Multiple images analysis completed")
     return result